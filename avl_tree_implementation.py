@@ -5,21 +5,37 @@ class TreeNode:
         Args:
             key: The key associated with the node.
             val: The value associated with the key.
+
+        The node also tracks the number of nodes in its subtree (size),
+        which the tree uses to answer rank and select queries.
+        Attributes are stored in __slots__ rather than a per-instance __dict__
+        to keep large trees compact.
     """
+    __slots__ = ('key', 'val', 'left', 'right', 'height', 'size')
+
     def __init__(self, key, val):
         self.key = key
         self.val = val
         self.left = None
         self.right = None
         self.height = 1
+        self.size = 1
 
 class AVLTree:
-    def __init__(self):
+    def __init__(self, node_class=TreeNode, metrics=None):
 
         """
         Initialize an AVL tree.
+
+        Args:
+            node_class: The class used to create nodes. It must provide the
+                TreeNode attributes (key, val, left, right, height, size).
+            metrics: Optional instrumentation.Metrics that counts rotations,
+                node visits and traversals.
         """
         self.root = None
+        self.node_class = node_class
+        self.metrics = metrics
 
     def insert(self, root, key, val):
 
@@ -36,34 +52,32 @@ class AVLTree:
         """
         
         if not root:
-            return TreeNode(key, val)
-        elif key < root.key:
-            root.left = self.insert(root.left, key, val)
-        elif key > root.key:
-            root.right = self.insert(root.right, key, val)
-        else:
-            root.val = val  # Update the value if the key already exists
+            return self.node_class(key, val)
+
+        path = []
+        node = root
+        while node:
+            path.append(node)
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                node.val = val  # Update the value if the key already exists
+                break
+
+        if self.metrics is not None:
+            self.metrics.count('node_visits', len(path))
+        if node:
             return root
 
-        root.height = 1 + max(self.getHeight(root.left), self.getHeight(root.right))
-
-        balance = self.getBalance(root)
-
-        if balance > 1 and key < root.left.key:
-            return self.rightRotate(root)
-
-        if balance < -1 and key > root.right.key:
-            return self.leftRotate(root)
-
-        if balance > 1 and key > root.left.key:
-            root.left = self.leftRotate(root.left)
-            return self.rightRotate(root)
-
-        if balance < -1 and key < root.right.key:
-            root.right = self.rightRotate(root.right)
-            return self.leftRotate(root)
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = self.node_class(key, val)
+        else:
+            parent.right = self.node_class(key, val)
 
-        return root
+        return self._retrace(root, path, 1)
 
     def delete(self, root, key):
 
@@ -77,36 +91,92 @@ class AVLTree:
         Returns:
             The root of the modified AVL tree.
         """
-        if not root:
+        path = []
+        node = root
+        while node and key != node.key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        if node is None:
+            if self.metrics is not None:
+                self.metrics.count('node_visits', len(path))
             return root
 
-        elif key < root.key:
-            root.left = self.delete(root.left, key)
+        if node.left is not None and node.right is not None:
+            # copy the in-order successor into this node and unlink the successor instead
+            path.append(node)
+            temp = node.right
+            while temp.left is not None:
+                path.append(temp)
+                temp = temp.left
+            node.key = temp.key
+            node.val = temp.val
+            node = temp
+
+        if self.metrics is not None:
+            self.metrics.count('node_visits', len(path) + 1)
+
+        child = node.left if node.left is not None else node.right
+        if not path:
+            return child
+
+        parent = path[-1]
+        if parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
 
-        elif key > root.key:
-            root.right = self.delete(root.right, key)
+        return self._retrace(root, path, -1)
 
-        else:
-            if root.left is None:
-                temp = root.right
-                root = None
-                return temp
+    def _retrace(self, root, path, delta):
 
-            elif root.right is None:
-                temp = root.left
-                root = None
-                return temp
+        """
+        Restore sizes, heights and balance along a search path after an insertion or deletion.
 
-            temp = self.getMinValueNode(root.right)
-            root.key = temp.key
-            root.val = temp.val
-            root.right = self.delete(root.right, temp.key)
+        Args:
+            root: The root node of the AVL tree.
+            path: The nodes from the root down to the parent of the inserted or removed node.
+            delta: The change in the number of nodes below each node on the path (1 or -1).
 
-        if root is None:
-            return root
+        Returns:
+            The root of the modified AVL tree.
+        """
+        rebalancing = True
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            node.size += delta
+            if not rebalancing:
+                # heights above this point are unchanged, only the sizes still need fixing
+                continue
+
+            old_height = node.height
+            node.height = 1 + max(self.getHeight(node.left), self.getHeight(node.right))
+            subtree = self._rebalance(node)
+
+            if subtree is not node:
+                if i == 0:
+                    root = subtree
+                elif path[i - 1].left is node:
+                    path[i - 1].left = subtree
+                else:
+                    path[i - 1].right = subtree
+
+            if subtree.height == old_height:
+                rebalancing = False
+
+        return root
+
+    def _rebalance(self, root):
+
+        """
+        Apply the rotations needed to restore the AVL property at a node.
 
-        root.height = 1 + max(self.getHeight(root.left), self.getHeight(root.right))
+        Args:
+            root: The node whose children are balanced but which may itself be unbalanced.
 
+        Returns:
+            The root of the rebalanced subtree.
+        """
         balance = self.getBalance(root)
 
         if balance > 1 and self.getBalance(root.left) >= 0:
@@ -125,6 +195,196 @@ class AVLTree:
 
         return root
 
+    def _build_balanced(self, keys, vals, lo, hi):
+
+        """
+        Build a perfectly balanced subtree from sorted parallel sequences in linear time.
+
+        Args:
+            keys: The keys in strictly ascending order.
+            vals: The values, aligned with keys.
+            lo: The index of the first item of the subtree.
+            hi: One past the index of the last item of the subtree.
+
+        Returns:
+            The root of the subtree, or None if it is empty.
+        """
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = self.node_class(keys[mid], vals[mid])
+        node.left = self._build_balanced(keys, vals, lo, mid)
+        node.right = self._build_balanced(keys, vals, mid + 1, hi)
+        node.height = 1 + max(self.getHeight(node.left), self.getHeight(node.right))
+        node.size = hi - lo
+        return node
+
+    @classmethod
+    def from_sorted(cls, items, node_class=TreeNode, metrics=None):
+
+        """
+        Build a perfectly balanced AVL tree from sorted items in linear time.
+
+        Args:
+            items: An iterable of (key, value) pairs in strictly ascending key order.
+            node_class: The class used to create nodes.
+            metrics: Optional instrumentation.Metrics.
+
+        Returns:
+            The new AVL tree.
+
+        Raises:
+            ValueError: If the keys are not strictly ascending.
+        """
+        tree = cls(node_class, metrics)
+        keys = []
+        vals = []
+        for key, val in items:
+            if keys and not keys[-1] < key:
+                raise ValueError("Keys must be strictly ascending")
+            keys.append(key)
+            vals.append(val)
+        tree.root = tree._build_balanced(keys, vals, 0, len(keys))
+        return tree
+
+    def bulk_insert(self, items):
+
+        """
+        Insert a sorted batch of key-value pairs into the AVL tree.
+
+        A small batch is inserted key by key; a large one is merged with the existing items and
+        the tree is rebuilt in O(n + m). As with insert, the batch value wins for an existing key.
+
+        Args:
+            items: A sequence of (key, value) pairs in strictly ascending key order.
+
+        Raises:
+            ValueError: If the keys are not strictly ascending.
+        """
+        for i in range(1, len(items)):
+            if not items[i - 1][0] < items[i][0]:
+                raise ValueError("Keys must be strictly ascending")
+
+        n = self.getSize(self.root)
+        if len(items) * max(n.bit_length(), 1) < n:
+            for key, val in items:
+                self.root = self.insert(self.root, key, val)
+            return
+
+        keys = []
+        vals = []
+        batch = iter(items)
+        pending = next(batch, None)
+        for key, val in self._iterate(self.root, False):
+            while pending is not None and pending[0] < key:
+                keys.append(pending[0])
+                vals.append(pending[1])
+                pending = next(batch, None)
+            if pending is not None and pending[0] == key:
+                val = pending[1]
+                pending = next(batch, None)
+            keys.append(key)
+            vals.append(val)
+        while pending is not None:
+            keys.append(pending[0])
+            vals.append(pending[1])
+            pending = next(batch, None)
+        self.root = self._build_balanced(keys, vals, 0, len(keys))
+
+    def split(self, key):
+
+        """
+        Split the AVL tree at a key in O(log n).
+
+        The nodes are moved into the two new trees, so this tree is left empty.
+
+        Args:
+            key: The split key. It does not need to be present in the tree.
+
+        Returns:
+            A tuple (left, right) of AVL trees holding the keys < key and the keys >= key.
+        """
+        left_root, right_root = self._split(self.root, key)
+        self.root = None
+        left = type(self)(self.node_class, self.metrics)
+        left.root = left_root
+        right = type(self)(self.node_class, self.metrics)
+        right.root = right_root
+        return left, right
+
+    @classmethod
+    def join(cls, left, right):
+
+        """
+        Concatenate two AVL trees in O(log n).
+
+        The nodes are moved into the new tree, so both trees are left empty.
+
+        Args:
+            left: An AVL tree whose keys are all smaller than the keys of right.
+            right: An AVL tree.
+
+        Returns:
+            The AVL tree holding the keys of both trees.
+        """
+        tree = cls(left.node_class, left.metrics)
+        if left.root is None:
+            tree.root = right.root
+        elif right.root is None:
+            tree.root = left.root
+        else:
+            # the largest key of left becomes the node joining the two trees
+            pivot = left.getMaxValueNode(left.root)
+            pivot = tree.node_class(pivot.key, pivot.val)
+            tree.root = tree._join(left.delete(left.root, pivot.key), pivot, right.root)
+        left.root = None
+        right.root = None
+        return tree
+
+    def _split(self, root, key):
+
+        """
+        Split a subtree into the nodes with keys < key and the nodes with keys >= key.
+
+        Returns:
+            A tuple of the roots of the two subtrees.
+        """
+        if root is None:
+            return None, None
+        left, right = root.left, root.right
+        if root.key < key:
+            below, above = self._split(right, key)
+            return self._join(left, root, below), above
+        below, above = self._split(left, key)
+        return below, self._join(above, root, right)
+
+    def _join(self, left, pivot, right):
+
+        """
+        Join two subtrees and a pivot node whose key lies between them.
+
+        Only the spine of the taller subtree down to the height of the shorter one is visited,
+        so this takes O(|height(left) - height(right)| + 1) time.
+
+        Returns:
+            The root of the joined subtree.
+        """
+        left_height = self.getHeight(left)
+        right_height = self.getHeight(right)
+        if left_height > right_height + 1:
+            left.right = self._join(left.right, pivot, right)
+            subtree = left
+        elif right_height > left_height + 1:
+            right.left = self._join(left, pivot, right.left)
+            subtree = right
+        else:
+            pivot.left = left
+            pivot.right = right
+            subtree = pivot
+        subtree.height = 1 + max(self.getHeight(subtree.left), self.getHeight(subtree.right))
+        subtree.size = 1 + self.getSize(subtree.left) + self.getSize(subtree.right)
+        return self._rebalance(subtree)
+
     def leftRotate(self, z):
 
         """
@@ -136,6 +396,8 @@ class AVLTree:
         Returns:
             The new root after the left rotation.
         """
+        if self.metrics is not None:
+            self.metrics.count('rotations')
         y = z.right
         T2 = y.left
 
@@ -144,6 +406,8 @@ class AVLTree:
 
         z.height = 1 + max(self.getHeight(z.left), self.getHeight(z.right))
         y.height = 1 + max(self.getHeight(y.left), self.getHeight(y.right))
+        z.size = 1 + self.getSize(z.left) + self.getSize(z.right)
+        y.size = 1 + self.getSize(y.left) + self.getSize(y.right)
 
         return y
 
@@ -157,6 +421,8 @@ class AVLTree:
         Returns:
             The new root after the right rotation.
         """
+        if self.metrics is not None:
+            self.metrics.count('rotations')
         x = y.left
         T2 = x.right
 
@@ -165,6 +431,8 @@ class AVLTree:
 
         y.height = 1 + max(self.getHeight(y.left), self.getHeight(y.right))
         x.height = 1 + max(self.getHeight(x.left), self.getHeight(x.right))
+        y.size = 1 + self.getSize(y.left) + self.getSize(y.right)
+        x.size = 1 + self.getSize(x.left) + self.getSize(x.right)
 
         return x
 
@@ -182,6 +450,20 @@ class AVLTree:
             return 0
         return root.height
 
+    def getSize(self, root):
+        """
+        Get the number of nodes in the subtree rooted at a node.
+
+        Args:
+            root: The root node of the subtree.
+
+        Returns:
+            The number of nodes in the subtree.
+        """
+        if not root:
+            return 0
+        return root.size
+
     def getBalance(self, root):
         """
         Get the balance factor of a node in the AVL tree.
@@ -206,9 +488,27 @@ class AVLTree:
         Returns:
             The node with the minimum key.
         """
-        if root is None or root.left is None:
+        if root is None:
+            return root
+        while root.left is not None:
+            root = root.left
+        return root
+
+    def getMaxValueNode(self, root):
+        """
+        Get the node with the maximum key in the AVL tree.
+
+        Args:
+            root: The root node of the AVL tree.
+
+        Returns:
+            The node with the maximum key.
+        """
+        if root is None:
             return root
-        return self.getMinValueNode(root.left)
+        while root.right is not None:
+            root = root.right
+        return root
 
     def preOrder(self, root):
         """
@@ -236,16 +536,90 @@ class AVLTree:
         """
         if result is None:
             result = []
-        if root:
-            self.inOrder(root.left, result)
-            result.append((root.key, root.val))
-            self.inOrder(root.right, result)
+        result.extend(self._iterate(root, False))
+        return dict(result)
+
+    def _iterate(self, root, reverse, key=None):
+        """
+        Lazily walk the subtree rooted at root using an explicit stack.
+
+        Args:
+            root: The root node of the subtree to walk.
+            reverse: Walk in descending key order when True.
+            key: Optional bound; only keys >= key (ascending) or <= key
+                (descending) are yielded.
+
+        Yields:
+            (key, value) tuples in the requested order.
+        """
+        if self.metrics is not None:
+            self.metrics.count('traversals')
+        stack = []
+        node = root
+        # descend to the first node in range, remembering the path of nodes still to visit
+        while node:
+            if key is not None and (node.key > key if reverse else node.key < key):
+                node = node.left if reverse else node.right
+                continue
+            stack.append(node)
+            node = node.right if reverse else node.left
+        while stack:
+            node = stack.pop()
+            yield (node.key, node.val)
+            node = node.left if reverse else node.right
+            while node:
+                stack.append(node)
+                node = node.right if reverse else node.left
+
+    def iter_items(self):
+        """
+        Iterate over the key-value pairs in the AVL tree in sorted order.
+
+        Yields:
+            (key, value) tuples in ascending key order.
+        """
+        return self._iterate(self.root, False)
+
+    def iter_reverse(self):
+        """
+        Iterate over the key-value pairs in the AVL tree in reverse sorted order.
+
+        Yields:
+            (key, value) tuples in descending key order.
+        """
+        return self._iterate(self.root, True)
+
+    def iter_from(self, key, reverse=False):
+        """
+        Iterate over the key-value pairs starting at the given key.
 
-        temp_dict = {}
-        for item in result:
-            temp_dict[item[0]] = item[1]
-        return temp_dict
+        Args:
+            key: The starting key. It does not need to be present in the tree.
+            reverse: If True, yield keys <= key in descending order instead of
+                keys >= key in ascending order.
+
+        Yields:
+            (key, value) tuples in the requested order.
+        """
+        return self._iterate(self.root, reverse, key)
+
+    def range(self, lo, hi):
+        """
+        Iterate over the key-value pairs whose keys lie in a closed interval.
 
+        Only the O(log n + k) nodes on the search path and inside the interval are visited.
+
+        Args:
+            lo: The smallest key to include.
+            hi: The largest key to include.
+
+        Yields:
+            (key, value) tuples with lo <= key <= hi in ascending key order.
+        """
+        for key, val in self._iterate(self.root, False, lo):
+            if key > hi:
+                return
+            yield (key, val)
 
     def getSortedItems(self):
         """
@@ -267,14 +641,18 @@ class AVLTree:
         Returns:
             The value associated with the key, or None if the key is not found.
         """
-        if root is None:
-            return None
-        if key < root.key:
-            return self.getNode(root.left, key)
-        elif key > root.key:
-            return self.getNode(root.right, key)
-        else:
-            return root.val
+        visits = 0
+        while root is not None:
+            visits += 1
+            if key < root.key:
+                root = root.left
+            elif key > root.key:
+                root = root.right
+            else:
+                break
+        if self.metrics is not None:
+            self.metrics.count('node_visits', visits)
+        return None if root is None else root.val
         
     def update(self, root, key, new_val):
         """
@@ -288,14 +666,15 @@ class AVLTree:
         Returns:
             The root of the modified AVL tree.
         """
-        if not root:
-            return None
-        if key < root.key:
-            root.left = self.update(root.left, key, new_val)
-        elif key > root.key:
-            root.right = self.update(root.right, key, new_val)
-        else:
-            root.val = new_val
+        node = root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                node.val = new_val
+                break
         return root
     
     def reverseInOrder(self, root, result=None):
@@ -311,10 +690,7 @@ class AVLTree:
         """
         if result is None:
             result = []
-        if root:
-            self.reverseInOrder(root.right, result)
-            result.append((root.key, root.val))
-            self.reverseInOrder(root.left, result)
+        result.extend(self._iterate(root, True))
         return result
 
 
@@ -325,11 +701,7 @@ class AVLTree:
         Returns:
             A dictionary of key-value pairs in reverse sorted order.
         """
-        sorted_items = self.reverseInOrder(self.root)
-        dict_temp = {}
-        for item in sorted_items:
-            dict_temp[item[0]] = item[1]    
-        return dict_temp
+        return dict(self.iter_reverse())
     
     def countNodes(self, root):
         """
@@ -342,9 +714,16 @@ class AVLTree:
             The number of nodes in the AVL tree.
         """
 
-        if not root:
-            return 0
-        return 1 + self.countNodes(root.left) + self.countNodes(root.right)
+        count = 0
+        stack = [root] if root else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+        return count
 
     def getNumberOfNodes(self):
         """
@@ -353,7 +732,361 @@ class AVLTree:
         Returns:
             The total number of nodes in the AVL tree.
         """
-        return self.countNodes(self.root)
+        return self.getSize(self.root)
+
+    def __len__(self):
+        return self.getSize(self.root)
+
+    def get(self, key):
+        """
+        Get the value of a key (ordered map protocol, see ordered_maps).
+
+        Returns:
+            The value associated with the key, or None if the key is not found.
+        """
+        return self.getNode(self.root, key)
+
+    def put(self, key, val):
+        """
+        Insert a key-value pair, replacing the value if the key exists (ordered map protocol).
+        """
+        self.root = self.insert(self.root, key, val)
+
+    def remove(self, key):
+        """
+        Delete a key if it is present (ordered map protocol).
+        """
+        self.root = self.delete(self.root, key)
+
+    def min_item(self):
+        """
+        Get the item with the smallest key (ordered map protocol).
+
+        Returns:
+            A (key, value) tuple, or None if the tree is empty.
+        """
+        node = self.getMinValueNode(self.root)
+        if node is None:
+            return None
+        return (node.key, node.val)
+
+    def clear(self):
+        """
+        Remove every key in O(1) (ordered map protocol).
+        """
+        self.root = None
+
+    def rank(self, key):
+        """
+        Get the number of keys in the AVL tree that are smaller than the given key.
+
+        Args:
+            key: The key to rank. It does not need to be present in the tree.
+
+        Returns:
+            The 0-based position the key has (or would have) in sorted order.
+        """
+        node = self.root
+        result = 0
+        while node:
+            if key <= node.key:
+                node = node.left
+            else:
+                result += 1 + self.getSize(node.left)
+                node = node.right
+        return result
+
+    def select(self, k):
+        """
+        Get the k-th smallest key-value pair in the AVL tree.
+
+        Args:
+            k: The 0-based position in sorted order.
+
+        Returns:
+            A (key, value) tuple, or None if k is out of range.
+        """
+        node = self.root
+        while node:
+            left_size = self.getSize(node.left)
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return (node.key, node.val)
+        return None
+
+class PersistentAVLTree(AVLTree):
+
+    """
+    AVL tree whose nodes are never modified once they are reachable from a root.
+
+    insert, delete and update copy the nodes on the search path (and the nodes taking part in
+    rotations) and return a new root that shares every untouched subtree with the old one, so
+    an old root stays a valid, unchanging version of the tree. snapshot() captures the current
+    version in O(1), and diff() compares two versions by walking only the nodes they do not share.
+    The read-only methods are inherited from AVLTree.
+    """
+
+    def _copy(self, node):
+
+        """
+        Return a fresh copy of a node that can be modified.
+        """
+        copy = self.node_class(node.key, node.val)
+        copy.left = node.left
+        copy.right = node.right
+        copy.height = node.height
+        copy.size = node.size
+        return copy
+
+    def insert(self, root, key, val):
+
+        """
+        Insert a key-value pair, returning the root of the new version.
+
+        Args:
+            root: The root node of the version to insert into; it is not modified.
+            key: The key to insert.
+            val: The value associated with the key.
+
+        Returns:
+            The root of the new version.
+        """
+        if not root:
+            return self.node_class(key, val)
+
+        path = []
+        node = root
+        while node:
+            copy = self._copy(node)
+            if path:
+                if path[-1].left is node:
+                    path[-1].left = copy
+                else:
+                    path[-1].right = copy
+            path.append(copy)
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                copy.val = val  # Update the value if the key already exists
+                if self.metrics is not None:
+                    self.metrics.count('node_visits', len(path))
+                return path[0]
+
+        if self.metrics is not None:
+            self.metrics.count('node_visits', len(path))
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = self.node_class(key, val)
+        else:
+            parent.right = self.node_class(key, val)
+
+        return self._retrace(path[0], path, 1)
+
+    def delete(self, root, key):
+
+        """
+        Delete a key, returning the root of the new version.
+
+        Args:
+            root: The root node of the version to delete from; it is not modified.
+            key: The key to delete.
+
+        Returns:
+            The root of the new version, or root itself if the key is not present.
+        """
+        node = root
+        while node and key != node.key:
+            node = node.left if key < node.key else node.right
+        if node is None:
+            return root
+
+        # copy the search path down to the node holding the key
+        path = []
+        node = root
+        while True:
+            copy = self._copy(node)
+            if path:
+                if path[-1].left is node:
+                    path[-1].left = copy
+                else:
+                    path[-1].right = copy
+            if key == node.key:
+                break
+            path.append(copy)
+            node = node.left if key < node.key else node.right
+
+        if copy.left is not None and copy.right is not None:
+            # copy the path on to the in-order successor, move it into the copied node and unlink it instead
+            target = copy
+            path.append(target)
+            node = node.right
+            while True:
+                copy = self._copy(node)
+                if path[-1].left is node:
+                    path[-1].left = copy
+                else:
+                    path[-1].right = copy
+                if node.left is None:
+                    break
+                path.append(copy)
+                node = node.left
+            target.key = copy.key
+            target.val = copy.val
+
+        if self.metrics is not None:
+            self.metrics.count('node_visits', len(path) + 1)
+
+        child = copy.left if copy.left is not None else copy.right
+        if not path:
+            return child
+
+        parent = path[-1]
+        if parent.left is copy:
+            parent.left = child
+        else:
+            parent.right = child
+
+        return self._retrace(path[0], path, -1)
+
+    def update(self, root, key, new_val):
+
+        """
+        Update the value of a present key, returning the root of the new version.
+
+        Args:
+            root: The root node of the version to update; it is not modified.
+            key: The key whose value is to be updated.
+            new_val: The new value to be associated with the key.
+
+        Returns:
+            The root of the new version, or root itself if the key is not present.
+        """
+        node = root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return self.insert(root, key, new_val)
+        return root
+
+    def leftRotate(self, z):
+
+        """
+        Perform a left rotation on copies of the two nodes involved.
+        """
+        z = self._copy(z)
+        z.right = self._copy(z.right)
+        return super().leftRotate(z)
+
+    def rightRotate(self, y):
+
+        """
+        Perform a right rotation on copies of the two nodes involved.
+        """
+        y = self._copy(y)
+        y.left = self._copy(y.left)
+        return super().rightRotate(y)
+
+    def _join(self, left, pivot, right):
+
+        """
+        Join two subtrees and a pivot node, copying every node that is modified.
+        """
+        left_height = self.getHeight(left)
+        right_height = self.getHeight(right)
+        if left_height > right_height + 1:
+            subtree = self._copy(left)
+            subtree.right = self._join(left.right, pivot, right)
+        elif right_height > left_height + 1:
+            subtree = self._copy(right)
+            subtree.left = self._join(left, pivot, right.left)
+        else:
+            subtree = self._copy(pivot)
+            subtree.left = left
+            subtree.right = right
+        subtree.height = 1 + max(self.getHeight(subtree.left), self.getHeight(subtree.right))
+        subtree.size = 1 + self.getSize(subtree.left) + self.getSize(subtree.right)
+        return self._rebalance(subtree)
+
+    def snapshot(self):
+
+        """
+        Capture the current version of the tree in O(1).
+
+        Returns:
+            A PersistentAVLTree holding the current version; later changes to this tree do not affect it.
+        """
+        snapshot = type(self)(self.node_class, self.metrics)
+        snapshot.root = self.root
+        return snapshot
+
+    def diff(self, other):
+
+        """
+        Compare this version of the tree with another version.
+
+        Subtrees shared by both versions are skipped without being visited, so comparing two
+        versions a few updates apart takes time proportional to the number of copied nodes.
+
+        Args:
+            other: A PersistentAVLTree holding the other version, e.g. an earlier snapshot.
+
+        Yields:
+            (key, old_val, new_val) tuples in ascending key order for every key whose value differs,
+            where old_val is the value in other and new_val the value in this tree; the value is
+            None on the side where the key is absent.
+        """
+        old = [other.root] if other.root is not None else []
+        new = [self.root] if self.root is not None else []
+        while old or new:
+            old_top = old[-1] if old else None
+            new_top = new[-1] if new else None
+            if old_top is not None and old_top is new_top:
+                old.pop()
+                new.pop()
+                continue
+
+            # expand unvisited subtrees into (left subtree, item, right subtree) until both tops are items
+            if isinstance(old_top, self.node_class) and (not isinstance(new_top, self.node_class)
+                                                         or old_top.height >= new_top.height):
+                self._expand(old)
+                continue
+            if isinstance(new_top, self.node_class):
+                self._expand(new)
+                continue
+
+            if new_top is None or (old_top is not None and old_top[0] < new_top[0]):
+                old.pop()
+                yield (old_top[0], old_top[1], None)
+            elif old_top is None or new_top[0] < old_top[0]:
+                new.pop()
+                yield (new_top[0], None, new_top[1])
+            else:
+                old.pop()
+                new.pop()
+                if old_top[1] is not new_top[1] and old_top[1] != new_top[1]:
+                    yield (new_top[0], old_top[1], new_top[1])
+
+    def _expand(self, stack):
+
+        """
+        Replace the subtree on top of a diff stack by its right subtree, its item and its left subtree.
+        """
+        node = stack.pop()
+        if node.right is not None:
+            stack.append(node.right)
+        stack.append((node.key, node.val))
+        if node.left is not None:
+            stack.append(node.left)
+
 
 if __name__ == "__main__":
     # Driver code
@@ -0,0 +1,85 @@
+"""
+Report the memory used per AVLTree node for the available node layouts, with no values, with
+per-order dictionaries as values (the record layout before order_store) and with slots of
+records in an OrderStore (the tree and the store are measured together).
+
+Usage:
+    python -m benchmarks.avl_memory [--sizes 100000 1000000]
+"""
+import argparse
+import tracemalloc
+
+from avl_tree_implementation import AVLTree, TreeNode
+from order_store import OrderStore
+
+
+class DictTreeNode:
+
+    """
+    A node with a per-instance __dict__, the layout TreeNode had before it used __slots__.
+    """
+
+    def __init__(self, key, val):
+        self.key = key
+        self.val = val
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.size = 1
+
+
+def order_record(order_id):
+
+    """
+    Build a value shaped like the per-order dictionaries Ordersystem.orders_avl stored before order_store.
+    """
+    return {'creation_time': order_id,
+            'order_value': 100,
+            'delivery_time': 5,
+            'priority': -0.7 * order_id,
+            'eta': order_id + 5,
+            'out_for_delivery': False}
+
+
+# the kinds of values measure() can store
+VALUES = ('none', 'order records', 'store slots')
+
+
+def measure(node_class, n, values):
+
+    """
+    Build a tree of n keys with the given kind of values and return the bytes allocated per node.
+    """
+    # keys are allocated up front so only the tree itself is measured
+    keys = list(range(1000, 1000 + n))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = AVLTree(node_class=node_class)
+    store = OrderStore()
+    for key in keys:
+        if values == 'order records':
+            val = order_record(key)
+        elif values == 'store slots':
+            val = store.allocate(key, 100, 5, -0.7 * key, key + 5, False)
+        else:
+            val = None
+        tree.root = tree.insert(tree.root, key, val)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'keys':>10} {'values':>14} {'__dict__ (B/node)':>18} {'__slots__ (B/node)':>19}")
+    for n in args.sizes:
+        for values in VALUES:
+            print(f"{n:>10} {values:>14} {measure(DictTreeNode, n, values):>18.1f} "
+                  f"{measure(TreeNode, n, values):>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
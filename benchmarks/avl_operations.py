@@ -0,0 +1,140 @@
+"""
+Benchmark the iterative AVLTree engine against the original recursive one, and bulk loading
+with AVLTree.from_sorted against inserting the keys one by one.
+
+Usage:
+    python -m benchmarks.avl_operations [--sizes 10000 100000 1000000] [--seed 0]
+"""
+import argparse
+import random
+import time
+
+from avl_tree_implementation import AVLTree
+
+
+class RecursiveAVLTree(AVLTree):
+
+    """
+    The recursive insert/delete/getNode the tree used before the iterative engine, kept for comparison.
+    """
+
+    def insert(self, root, key, val):
+        if not root:
+            return self.node_class(key, val)
+        elif key < root.key:
+            root.left = self.insert(root.left, key, val)
+        elif key > root.key:
+            root.right = self.insert(root.right, key, val)
+        else:
+            root.val = val
+            return root
+
+        root.height = 1 + max(self.getHeight(root.left), self.getHeight(root.right))
+        root.size = 1 + self.getSize(root.left) + self.getSize(root.right)
+        return self._rebalance(root)
+
+    def delete(self, root, key):
+        if not root:
+            return root
+        elif key < root.key:
+            root.left = self.delete(root.left, key)
+        elif key > root.key:
+            root.right = self.delete(root.right, key)
+        else:
+            if root.left is None:
+                return root.right
+            elif root.right is None:
+                return root.left
+            temp = self.getMinValueNode(root.right)
+            root.key = temp.key
+            root.val = temp.val
+            root.right = self.delete(root.right, temp.key)
+
+        root.height = 1 + max(self.getHeight(root.left), self.getHeight(root.right))
+        root.size = 1 + self.getSize(root.left) + self.getSize(root.right)
+        return self._rebalance(root)
+
+    def getNode(self, root, key):
+        if root is None:
+            return None
+        if key < root.key:
+            return self.getNode(root.left, key)
+        elif key > root.key:
+            return self.getNode(root.right, key)
+        return root.val
+
+
+def time_operations(tree_cls, keys):
+
+    """
+    Time n inserts, n lookups and n deletes of the given keys.
+
+    Returns:
+        A dictionary of elapsed seconds per operation type.
+    """
+    tree = tree_cls()
+    timings = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        tree.root = tree.insert(tree.root, key, key)
+    timings['insert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        tree.getNode(tree.root, key)
+    timings['getNode'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        tree.root = tree.delete(tree.root, key)
+    timings['delete'] = time.perf_counter() - start
+
+    return timings
+
+
+def time_bulk_load(keys):
+
+    """
+    Time building a tree from sorted keys with n inserts and with AVLTree.from_sorted.
+
+    Returns:
+        A tuple (insert seconds, from_sorted seconds).
+    """
+    items = [(key, key) for key in sorted(keys)]
+
+    start = time.perf_counter()
+    tree = AVLTree()
+    for key, val in items:
+        tree.root = tree.insert(tree.root, key, val)
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    AVLTree.from_sorted(items)
+    return inserted, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'keys':>10} {'operation':>10} {'recursive (s)':>14} {'iterative (s)':>14} {'speedup':>8}")
+    for n in args.sizes:
+        keys = list(range(n))
+        random.Random(args.seed).shuffle(keys)
+        recursive = time_operations(RecursiveAVLTree, keys)
+        iterative = time_operations(AVLTree, keys)
+        for op in ('insert', 'getNode', 'delete'):
+            print(f"{n:>10} {op:>10} {recursive[op]:>14.3f} {iterative[op]:>14.3f} {recursive[op] / iterative[op]:>7.2f}x")
+
+    print()
+    print(f"{'keys':>10} {'insert loop (s)':>16} {'from_sorted (s)':>16} {'speedup':>8}")
+    for n in args.sizes:
+        inserted, bulk = time_bulk_load(list(range(n)))
+        print(f"{n:>10} {inserted:>16.3f} {bulk:>16.3f} {inserted / bulk:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
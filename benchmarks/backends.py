@@ -0,0 +1,94 @@
+"""
+Compare the ordered map backends of ordered_maps.BACKENDS.
+
+For every backend and map size, time random put, get, rank, ascending iteration and remove on
+the bare map, then time gatorDelivery.main on a generated workload of each size with that
+backend.
+
+Usage:
+    python -m benchmarks.backends [--sizes 1000 10000 100000] [--backends avl bplus skiplist bisect]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import gatorDelivery
+from ordered_maps import BACKENDS
+from benchmarks.workload import add_workload_arguments, workload_options, write_workload
+
+MAP_OPERATIONS = ('put', 'get', 'rank', 'iterate', 'remove')
+
+
+def time_map_operations(map_class, n, seed=0):
+
+    """
+    Time n random operations of every kind on a map of up to n keys.
+
+    Returns:
+        A dict mapping each operation in MAP_OPERATIONS to its total seconds.
+    """
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+    ordered_map = map_class()
+    timings = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        ordered_map.put(key, key)
+    timings['put'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        ordered_map.get(key)
+    timings['get'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        ordered_map.rank(key)
+    timings['rank'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in ordered_map.iter_items():
+        pass
+    timings['iterate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        ordered_map.remove(key)
+    timings['remove'] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=list(BACKENDS))
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    print("map operations (microseconds per operation)")
+    print(f"{'backend':>10} {'n':>8} " + " ".join(f"{op:>8}" for op in MAP_OPERATIONS))
+    for n in args.sizes:
+        for backend in args.backends:
+            timings = time_map_operations(BACKENDS[backend], n)
+            print(f"{backend:>10} {n:>8} " + " ".join(f"{timings[op] / n * 1e6:>8.2f}" for op in MAP_OPERATIONS))
+
+    print()
+    print("gatorDelivery.main (commands per second)")
+    print(f"{'backend':>10} {'commands':>8} {'seconds':>8} {'commands/s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'commands.txt')
+        output_path = os.path.join(tmp, 'output.txt')
+        for n in args.sizes:
+            write_workload(input_path, n, **workload_options(args))
+            for backend in args.backends:
+                start = time.perf_counter()
+                gatorDelivery.main(input_path, output_path, backend=backend)
+                elapsed = time.perf_counter() - start
+                print(f"{backend:>10} {n:>8} {elapsed:>8.3f} {n / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure the command throughput of gatorDelivery.main, with and without batching, against the
+previous readlines/if-elif driver.
+
+Usage:
+    python -m benchmarks.cli_throughput [--commands 100000] [--flush-sizes 4096 65536 1048576]
+                                        [--batch-sizes 64 1024]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import gatorDelivery
+from gatorDelivery import Ordersystem
+from benchmarks.workload import add_workload_arguments, workload_options, write_workload
+
+
+def legacy_main(input_filename, output_filename):
+
+    """
+    The driver main() used before streaming input, a dispatch table and buffered output.
+    """
+    file = open(output_filename, 'w')
+    oms = Ordersystem(file)
+
+    with open(input_filename, 'r') as f:
+        lines = f.readlines()
+
+    for line in lines:
+        line = line.strip()
+        command, args = line.split('(')
+        args = args[:-1]
+        if len(args) > 0:
+            args = [int(item) for item in args.split(',')]
+        if command == 'createOrder':
+            oms.func_create_order(args[0], args[1], args[2], args[3])
+        elif command == 'print':
+            if len(args) == 1:
+                oms.func_single_print(args[0])
+            else:
+                oms.func_double_print(args[0], args[1])
+        elif command == 'getRankOfOrder':
+            oms.func_get_rak_of_order(args[0])
+        elif command == 'updateTime':
+            oms.func_update_time(args[0], args[1], args[2])
+        elif command == 'cancelOrder':
+            oms.func_cancel_order(args[0], args[1])
+        elif command == 'Quit':
+            oms.func_deliver_remainig_orders()
+        else:
+            raise ValueError("Invalid command")
+    file.close()
+
+
+def commands_per_second(run, input_path, output_path, n):
+    start = time.perf_counter()
+    run(input_path, output_path)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=100_000)
+    parser.add_argument('--flush-sizes', type=int, nargs='+', default=[4096, 65536, gatorDelivery.DEFAULT_FLUSH_SIZE])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[64, 1024])
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'commands.txt')
+        output_path = os.path.join(tmp, 'output.txt')
+        write_workload(input_path, args.commands, **workload_options(args))
+
+        print(f"{'driver':>24} {'commands/s':>12}")
+        print(f"{'legacy main':>24} {commands_per_second(legacy_main, input_path, output_path, args.commands):>12.0f}")
+        for flush_size in args.flush_sizes:
+            run = lambda i, o: gatorDelivery.main(i, o, flush_size=flush_size)
+            label = f"main flush_size={flush_size}"
+            print(f"{label:>24} {commands_per_second(run, input_path, output_path, args.commands):>12.0f}")
+        for batch_size in args.batch_sizes:
+            run = lambda i, o: gatorDelivery.main(i, o, batch_size=batch_size)
+            label = f"main batch_size={batch_size}"
+            print(f"{label:>24} {commands_per_second(run, input_path, output_path, args.commands):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure how query throughput of ConcurrentOrdersystem scales with the number of worker threads.
+
+The default workload has ten queries for every mutation. Each worker count is timed end to end
+through concurrent_ordersystem.main, next to the sequential gatorDelivery.main. Query threads
+only run in parallel where the interpreter allows it (e.g. a free-threaded build); with a GIL
+the numbers show the overhead of the thread pool instead.
+
+Usage:
+    python -m benchmarks.concurrent_queries [--commands 20000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import concurrent_ordersystem
+import gatorDelivery
+from benchmarks.workload import add_workload_arguments, workload_options, write_workload
+
+# ten queries for every mutation
+QUERY_HEAVY_MIX = {
+    'createOrder': 0.06,
+    'cancelOrder': 0.015,
+    'updateTime': 0.015,
+    'print': 0.35,
+    'printRange': 0.20,
+    'getRankOfOrder': 0.36,
+}
+
+
+def count_queries(path):
+    with open(path) as f:
+        return sum(1 for line in f if line.startswith(('print', 'getRankOfOrder')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+    options = workload_options(args)
+    options['mix'] = options['mix'] or QUERY_HEAVY_MIX
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'commands.txt')
+        output_path = os.path.join(tmp, 'output.txt')
+        write_workload(input_path, args.commands, **options)
+        queries = count_queries(input_path)
+
+        print(f"{'driver':>24} {'seconds':>8} {'queries/s':>10}")
+        start = time.perf_counter()
+        gatorDelivery.main(input_path, output_path)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':>24} {elapsed:>8.3f} {queries / elapsed:>10.0f}")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            concurrent_ordersystem.main(input_path, output_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            label = f"concurrent workers={workers}"
+            print(f"{label:>24} {elapsed:>8.3f} {queries / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
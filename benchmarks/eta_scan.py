@@ -0,0 +1,111 @@
+"""
+Benchmark the vectorized ETA scan against the one-order-at-a-time recurrence.
+
+The kernel rows time eta_scan.scan_etas (NumPy) against the pure Python loop on plain arrays;
+they are skipped when NumPy is not installed, since scan_etas then is the pure Python loop. The
+queue rows time a full ETA recomputation of an Ordersystem holding n queued orders after the
+driver return time moved, once per engine.
+
+Usage:
+    python -m benchmarks.eta_scan [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import random
+import time
+
+import eta_scan
+from gatorDelivery import Ordersystem
+from order_store import FIELDS
+
+# timed runs of each kernel; the fastest one is reported
+KERNEL_REPEATS = 5
+
+
+def time_kernel(n, seed=0, repeats=KERNEL_REPEATS):
+
+    """
+    Time scan_etas and the pure Python loop on n random orders.
+
+    Both are run once to warm up and then alternately repeats times, keeping the fastest run of each.
+
+    Returns:
+        A tuple (loop seconds, scan seconds).
+    """
+    rng = random.Random(seed)
+    creation_times = sorted(rng.randrange(4 * n) for _ in range(n))
+    delivery_times = [rng.randint(1, 10) for _ in range(n)]
+
+    expected = eta_scan._scan_etas_python(creation_times, delivery_times, 0)
+    assert eta_scan.scan_etas(creation_times, delivery_times, 0) == expected
+
+    loop = scan = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        eta_scan._scan_etas_python(creation_times, delivery_times, 0)
+        loop = min(loop, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        eta_scan.scan_etas(creation_times, delivery_times, 0)
+        scan = min(scan, time.perf_counter() - start)
+    return loop, scan
+
+
+def queued_system(n, file, vectorized_eta):
+
+    """
+    Build an Ordersystem with n queued orders created one time unit apart.
+    """
+    oms = Ordersystem(file, vectorized_eta=vectorized_eta)
+    oms.first_order = False
+    delivery_times = [1 + i % 7 for i in range(n)]
+    etas, _ = eta_scan.scan_etas(list(range(n)), delivery_times, 0)
+    order_priorities = [round(0.3 * 2 - 0.7 * i, 4) for i in range(n)]
+    values = {
+        'creation_time': list(range(n)),
+        'order_value': [100] * n,
+        'delivery_time': delivery_times,
+        'priority': order_priorities,
+        'eta': [int(eta) for eta in etas],
+        'out_for_delivery': [False] * n,
+    }
+    columns = {name: values[name] for name, _ in FIELDS}
+    order_ids = list(range(1, n + 1))
+    priorities = list(zip(order_priorities, order_ids))
+    priorities.reverse()
+    oms.func_load_orders(order_ids, columns, priorities)
+    return oms
+
+
+def time_queue(n, vectorized_eta):
+
+    """
+    Time the recomputation of every queued ETA after the driver return time moved.
+    """
+    with open(os.devnull, 'w') as devnull:
+        oms = queued_system(n, devnull, vectorized_eta)
+        oms.driver_return_time = 10
+        oms.dirty_priorities.add(float('inf'))
+        start = time.perf_counter()
+        oms.func_update_eta(-100)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"NumPy: {'yes' if eta_scan.HAVE_NUMPY else 'no (pure Python fallback)'}")
+    print(f"{'orders':>10} {'benchmark':>10} {'loop (s)':>10} {'scan (s)':>10} {'speedup':>8}")
+    for n in args.sizes:
+        # without NumPy scan_etas is the pure Python loop itself, so there is nothing to compare
+        if eta_scan.HAVE_NUMPY:
+            loop, scan = time_kernel(n)
+            print(f"{n:>10} {'kernel':>10} {loop:>10.3f} {scan:>10.3f} {loop / scan:>7.2f}x")
+        loop, scan = time_queue(n, False), time_queue(n, True)
+        print(f"{n:>10} {'queue':>10} {loop:>10.3f} {scan:>10.3f} {loop / scan:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
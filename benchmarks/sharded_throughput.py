@@ -0,0 +1,48 @@
+"""
+Measure the command throughput of the sharded Ordersystem for several shard counts.
+
+Every shard runs in its own process, so throughput can scale up to the number of cores; the
+single-process gatorDelivery.main is timed for reference.
+
+Usage:
+    python -m benchmarks.sharded_throughput [--commands 200000] [--shards 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import gatorDelivery
+import sharded_ordersystem
+from benchmarks.workload import add_workload_arguments, workload_options, write_workload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=200_000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'commands.txt')
+        output_path = os.path.join(tmp, 'output.txt')
+        write_workload(input_path, args.commands, **workload_options(args))
+
+        print(f"cores: {os.cpu_count()}")
+        print(f"{'driver':>20} {'seconds':>8} {'commands/s':>11}")
+        start = time.perf_counter()
+        gatorDelivery.main(input_path, output_path)
+        elapsed = time.perf_counter() - start
+        print(f"{'single process':>20} {elapsed:>8.3f} {args.commands / elapsed:>11.0f}")
+
+        for shards in args.shards:
+            start = time.perf_counter()
+            sharded_ordersystem.main(input_path, output_path, shards)
+            elapsed = time.perf_counter() - start
+            label = f"shards={shards}"
+            print(f"{label:>20} {elapsed:>8.3f} {args.commands / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load generator for the asyncio socket server.
+
+One generated workload (without its final Quit()) is dealt round-robin to a number of client
+connections. Every client keeps up to --depth commands in flight and measures the latency of
+each command from sending it to receiving its complete response. Start the server first, e.g.
+python server.py, or pass --spawn to run one in this process.
+
+Usage:
+    python -m benchmarks.socket_load [--clients 8] [--depth 32] [--commands 100000] [--port 7878]
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+
+from server import DEFAULT_HOST, DEFAULT_PORT, OrderServer
+from benchmarks.suite import percentile, PERCENTILES
+from benchmarks.workload import add_workload_arguments, generate_commands, workload_options
+
+
+async def run_client(commands, depth, connect, latencies):
+
+    """
+    Send the commands over one connection with up to depth in flight, recording each latency.
+    """
+    reader, writer = await connect()
+    in_flight = asyncio.Semaphore(depth)
+    sent = deque()
+
+    async def receive():
+        for _ in commands:
+            while True:
+                line = await reader.readline()
+                if line == b"\n":
+                    break
+                if not line:
+                    raise ConnectionError("The server closed the connection")
+            latencies.append(time.perf_counter() - sent.popleft())
+            in_flight.release()
+
+    receiver = asyncio.create_task(receive())
+    for line in commands:
+        await in_flight.acquire()
+        sent.append(time.perf_counter())
+        writer.write(line.encode() + b"\n")
+    await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(args):
+    options = workload_options(args)
+    commands = list(generate_commands(args.commands + 1, **options))[:-1]
+    if args.unix is not None:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+
+    server = None
+    if args.spawn:
+        server = asyncio.create_task(OrderServer().serve(args.host, args.port, args.unix))
+        await asyncio.sleep(0.1)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(commands[client::args.clients], args.depth, connect, latencies)
+                           for client in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.cancel()
+
+    latencies.sort()
+    print(f"clients={args.clients} depth={args.depth} commands={len(latencies)}")
+    print(f"throughput: {len(latencies) / elapsed:.0f} commands/s")
+    print("latency: " + " ".join(f"p{p}={percentile(latencies, p) * 1e3:.2f}ms" for p in PERCENTILES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=100_000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=32, help='commands in flight per client')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help='connect to this Unix socket instead of TCP')
+    parser.add_argument('--spawn', action='store_true', help='run the server in this process')
+    add_workload_arguments(parser)
+    asyncio.run(run_load(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Run generated workloads through Ordersystem and report latency, throughput and memory.
+
+Usage:
+    python -m benchmarks.suite --sizes 1000 10000 100000 --output results.json
+
+Each size is run three times: end to end through gatorDelivery.main for throughput,
+command by command through Ordersystem for per-command latency percentiles, and once
+more under tracemalloc for peak memory (skip with --no-memory). With --metrics an
+instrumented run adds the tree and handler counters. The JSON written to
+--output can be compared across revisions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import gatorDelivery
+from gatorDelivery import Ordersystem, get_handler, parse_command
+from instrumentation import Metrics
+from benchmarks.workload import add_workload_arguments, workload_options, write_workload
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, p):
+
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    index = max(0, -(-len(sorted_values) * p // 100) - 1)
+    return sorted_values[index]
+
+
+def command_type(command, args):
+    if command == 'print' and len(args) == 2:
+        return 'printRange'
+    return command
+
+
+def measure_throughput(input_path):
+
+    """
+    Run the file end to end through main() and return the elapsed seconds.
+    """
+    start = time.perf_counter()
+    gatorDelivery.main(input_path, os.devnull)
+    return time.perf_counter() - start
+
+
+def measure_latencies(input_path):
+
+    """
+    Execute the file command by command and return the latencies in seconds per command type.
+    """
+    latencies = {}
+    with open(os.devnull, 'w') as output, open(input_path) as f:
+        oms = Ordersystem(output)
+        for line in f:
+            command, args = parse_command(line)
+            handler = get_handler(command, args)
+            start = time.perf_counter()
+            handler(oms, args)
+            elapsed = time.perf_counter() - start
+            latencies.setdefault(command_type(command, args), []).append(elapsed)
+    return latencies
+
+
+def measure_peak_memory(input_path):
+
+    """
+    Run the file through main() under tracemalloc and return the peak traced bytes.
+    """
+    tracemalloc.start()
+    gatorDelivery.main(input_path, os.devnull)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def collect_metrics(input_path):
+
+    """
+    Run the file through main() with instrumentation enabled and return the metrics snapshot.
+    """
+    metrics = Metrics()
+    gatorDelivery.main(input_path, os.devnull, metrics=metrics)
+    return metrics.snapshot()
+
+
+def summarize(latencies):
+    summary = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        summary[name] = {'count': len(values),
+                         'mean_us': sum(values) / len(values) * 1e6,
+                         'max_us': values[-1] * 1e6}
+        for p in PERCENTILES:
+            summary[name][f'p{p}_us'] = percentile(values, p) * 1e6
+    return summary
+
+
+def current_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, options, memory=True, metrics=False):
+
+    """
+    Benchmark every workload size and return the results as a JSON-serializable dictionary.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            input_path = os.path.join(tmp, f'workload_{n}.txt')
+            write_workload(input_path, n, **options)
+
+            seconds = measure_throughput(input_path)
+            result = {'commands': n,
+                      'seconds': seconds,
+                      'commands_per_second': n / seconds,
+                      'latency': summarize(measure_latencies(input_path))}
+            if memory:
+                result['peak_memory_bytes'] = measure_peak_memory(input_path)
+            if metrics:
+                result['metrics'] = collect_metrics(input_path)
+            results.append(result)
+
+    return {'revision': current_revision(),
+            'python': platform.python_version(),
+            'workload': options,
+            'results': results}
+
+
+def print_report(report):
+    for result in report['results']:
+        line = f"{result['commands']} commands: {result['commands_per_second']:.0f} commands/s"
+        if 'peak_memory_bytes' in result:
+            line += f", peak memory {result['peak_memory_bytes'] / 2 ** 20:.1f} MiB"
+        print(line)
+        if 'metrics' in result:
+            print("  " + ", ".join(f"{name} {value}" for name, value in sorted(result['metrics']['counters'].items())))
+        print(f"  {'command':>16} {'count':>8}" + "".join(f" {f'p{p} (us)':>10}" for p in PERCENTILES)
+              + f" {'max (us)':>10}")
+        for name, stats in result['latency'].items():
+            print(f"  {name:>16} {stats['count']:>8}" + "".join(f" {stats[f'p{p}_us']:>10.1f}" for p in PERCENTILES)
+                  + f" {stats['max_us']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--metrics', action='store_true', help='add an instrumented run to the results')
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, workload_options(args), memory=not args.no_memory, metrics=args.metrics)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Reproducible synthetic command streams for benchmarking Ordersystem.
+
+Usage:
+    python -m benchmarks.workload --commands 100000 --seed 1 > commands.txt
+"""
+import argparse
+import random
+import sys
+
+# default share of each command type in the generated stream
+DEFAULT_MIX = {
+    'createOrder': 0.40,
+    'cancelOrder': 0.10,
+    'updateTime': 0.10,
+    'print': 0.15,
+    'printRange': 0.10,
+    'getRankOfOrder': 0.15,
+}
+
+VALUE_DISTRIBUTIONS = ('uniform', 'exponential', 'pareto')
+
+# commands other than createOrder pick one of the most recently created orders, which are likely still queued
+RECENT_ORDERS = 64
+
+
+def draw_value(rng, distribution, max_value):
+
+    """
+    Draw an order value in [1, max_value] from the named distribution.
+    """
+    if distribution == 'uniform':
+        value = rng.randint(1, max_value)
+    elif distribution == 'exponential':
+        value = int(rng.expovariate(5 / max_value)) + 1
+    elif distribution == 'pareto':
+        value = int(rng.paretovariate(1.5) * max_value / 20)
+    else:
+        raise ValueError(f"Unknown value distribution {distribution}")
+    return min(max(value, 1), max_value)
+
+
+def generate_commands(n, seed=0, mix=None, time_step=2.0, value_distribution='uniform',
+                      max_value=500, max_delivery_time=3):
+
+    """
+    Lazily generate a stream of n commands ending with Quit().
+
+    Args:
+        n: The number of commands, including the final Quit().
+        seed: Seed of the random generator; the same arguments always give the same stream.
+        mix: Relative weights of the command types, see DEFAULT_MIX ("printRange" is print(t1, t2)).
+        time_step: The mean system time elapsed between two commands (exponentially distributed),
+            which sets the order arrival rate together with the createOrder weight.
+        value_distribution: One of VALUE_DISTRIBUTIONS, the distribution of order values.
+        max_value: The largest order value.
+        max_delivery_time: Delivery times are drawn uniformly from [1, max_delivery_time].
+
+    Yields:
+        Command lines without the trailing newline.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    commands = list(mix)
+    weights = [mix[command] for command in commands]
+
+    time = 0
+    next_order_id = 1
+    recent = []
+    priorities = set()
+
+    for _ in range(n - 1):
+        time += int(rng.expovariate(1 / time_step)) if time_step > 0 else 0
+        command = rng.choices(commands, weights)[0]
+
+        if command == 'createOrder' or not recent:
+            value = draw_value(rng, value_distribution, max_value)
+            # two orders with the same priority would overwrite each other in the priority tree
+            while round(0.3 * (value / 50) - 0.7 * time, 4) in priorities:
+                value = value + 1 if value < max_value else 1
+            priorities.add(round(0.3 * (value / 50) - 0.7 * time, 4))
+
+            order_id = next_order_id
+            next_order_id += 1
+            recent.append(order_id)
+            if len(recent) > RECENT_ORDERS:
+                recent.pop(0)
+            yield f"createOrder({order_id}, {time}, {value}, {rng.randint(1, max_delivery_time)})"
+        elif command == 'cancelOrder':
+            yield f"cancelOrder({rng.choice(recent)}, {time})"
+        elif command == 'updateTime':
+            yield f"updateTime({rng.choice(recent)}, {time}, {rng.randint(1, max_delivery_time)})"
+        elif command == 'print':
+            yield f"print({rng.choice(recent)})"
+        elif command == 'printRange':
+            start = time + rng.randint(0, 20)
+            yield f"print({start}, {start + rng.randint(0, 50)})"
+        elif command == 'getRankOfOrder':
+            yield f"getRankOfOrder({rng.choice(recent)})"
+        else:
+            raise ValueError(f"Unknown command type {command}")
+
+    yield "Quit()"
+
+
+def write_workload(path, n, **kwargs):
+
+    """
+    Write a generated command stream to a file, one command per line.
+    """
+    with open(path, 'w') as f:
+        for line in generate_commands(n, **kwargs):
+            f.write(line + "\n")
+
+
+def parse_mix(text):
+
+    """
+    Parse a mix such as "createOrder=0.5,print=0.5" into a dictionary of weights.
+    """
+    mix = {}
+    for item in text.split(','):
+        command, weight = item.split('=')
+        if command not in DEFAULT_MIX:
+            raise ValueError(f"Unknown command type {command}")
+        mix[command] = float(weight)
+    return mix
+
+
+def add_workload_arguments(parser):
+
+    """
+    Add the command line options that configure generate_commands.
+    """
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help='comma separated weights, e.g. createOrder=0.5,print=0.5')
+    parser.add_argument('--time-step', type=float, default=2.0, help='mean time between two commands')
+    parser.add_argument('--value-distribution', choices=VALUE_DISTRIBUTIONS, default='uniform')
+    parser.add_argument('--max-value', type=int, default=500)
+    parser.add_argument('--max-delivery-time', type=int, default=3)
+
+
+def workload_options(args):
+
+    """
+    Collect the generate_commands keyword arguments from parsed command line options.
+    """
+    return {'seed': args.seed, 'mix': args.mix, 'time_step': args.time_step,
+            'value_distribution': args.value_distribution, 'max_value': args.max_value,
+            'max_delivery_time': args.max_delivery_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=10_000)
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    for line in generate_commands(args.commands, **workload_options(args)):
+        sys.stdout.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Binary checkpoints of an Ordersystem, for restarting without replaying the whole command log.
+
+A checkpoint stores the complete state (the three trees, the delivery clock and the pending ETA
+recomputation) as flat typed arrays in machine-native byte order, together with the offsets in
+the input and output files it corresponds to. Loading memory-maps the file and rebuilds every
+tree in linear time from the sorted arrays.
+"""
+import mmap
+import os
+import struct
+from array import array
+
+from gatorDelivery import DEFAULT_FLUSH_SIZE, Ordersystem, get_handler, parse_command
+from order_store import FIELDS
+
+MAGIC = b'GDCKPT01'
+
+# magic, input offset, output offset, current_system_time, driver_return_time, last_order_eta,
+# first_order, has dirty_tail, dirty_tail, number of orders, number of priority entries, number of dirty priorities
+HEADER = struct.Struct('=8sqqqqq??dqqq')
+
+# the order_store columns saved per order, in file order
+COLUMNS = ('creation_time', 'order_value', 'delivery_time', 'eta', 'priority', 'out_for_delivery')
+TYPECODES = dict(FIELDS)
+
+# number of commands between two checkpoints in run_with_checkpoints
+DEFAULT_CHECKPOINT_EVERY = 100_000
+
+
+def save_checkpoint(oms, path, input_offset=0, output_offset=0):
+
+    """
+    Write the state of an Ordersystem to a checkpoint file.
+
+    Args:
+        oms: The Ordersystem to save.
+        path: The checkpoint file; it is replaced atomically.
+        input_offset: The byte offset in the command log up to which commands have been applied.
+        output_offset: The byte offset in the output file up to which output has been written.
+    """
+    order_ids = array('q')
+    slots = []
+    for order_id, slot in oms.orders_avl.iter_items():
+        order_ids.append(order_id)
+        slots.append(slot)
+    # the store columns are gathered in order_id order
+    columns = [array(TYPECODES[name], map(getattr(oms.store, name).__getitem__, slots)) for name in COLUMNS]
+
+    # the ETA index is saved as positions into the order arrays, in (eta, order_id) order
+    position = {order_id: i for i, order_id in enumerate(order_ids)}
+    eta_order = array('q', (position[order_id] for _, order_id in oms.eta_avl.iter_items()))
+
+    priority_keys = array('d')
+    priority_ids = array('q')
+    for priority, order_id in oms.priority_avl.iter_items():
+        priority_keys.append(priority)
+        priority_ids.append(order_id)
+
+    dirty = array('d', sorted(oms.dirty_priorities))
+
+    header = HEADER.pack(MAGIC, input_offset, output_offset, oms.current_system_time, oms.driver_return_time,
+                         oms.last_order_eta, oms.first_order, oms.dirty_tail is not None,
+                         oms.dirty_tail if oms.dirty_tail is not None else 0.0,
+                         len(order_ids), len(priority_keys), len(dirty))
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        for column in (order_ids, *columns, eta_order, priority_keys, priority_ids, dirty):
+            column.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path, file, metrics=None):
+
+    """
+    Rebuild an Ordersystem from a checkpoint file.
+
+    Args:
+        path: The checkpoint file written by save_checkpoint.
+        file: The file object the restored Ordersystem writes its output to.
+        metrics: Optional instrumentation.Metrics for the restored Ordersystem.
+
+    Returns:
+        A tuple (oms, input_offset, output_offset).
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        (magic, input_offset, output_offset, current_system_time, driver_return_time, last_order_eta,
+         first_order, has_dirty_tail, dirty_tail, n_orders, n_priorities, n_dirty) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Ordersystem checkpoint")
+
+        pos = HEADER.size
+
+        def read(typecode, count):
+            nonlocal pos
+            column = array(typecode)
+            column.frombytes(view[pos:pos + count * column.itemsize])
+            pos += count * column.itemsize
+            return column.tolist()
+
+        order_ids = read('q', n_orders)
+        columns = {name: read(TYPECODES[name], n_orders) for name in COLUMNS}
+        eta_order = read('q', n_orders)
+        priority_keys = read('d', n_priorities)
+        priority_ids = read('q', n_priorities)
+        dirty = read('d', n_dirty)
+
+    oms = Ordersystem(file, metrics=metrics)
+    oms.current_system_time = current_system_time
+    oms.driver_return_time = driver_return_time
+    oms.last_order_eta = last_order_eta
+    oms.first_order = first_order
+    oms.dirty_tail = dirty_tail if has_dirty_tail else None
+    oms.dirty_priorities = set(dirty)
+
+    etas = columns['eta']
+    oms.func_load_orders(order_ids, columns,
+                         list(zip(priority_keys, priority_ids)),
+                         [(etas[i], order_ids[i]) for i in eta_order])
+
+    return oms, input_offset, output_offset
+
+
+def _apply_from(oms, f, offset, output, checkpoint_path, checkpoint_every):
+
+    """
+    Apply the commands of a binary input file from offset on, checkpointing every checkpoint_every commands.
+    """
+    applied = 0
+    for raw in f:
+        offset += len(raw)
+        line = raw.decode()
+        if len(line.strip()) == 0:
+            continue
+        command, args = parse_command(line)
+        get_handler(command, args)(oms, args)
+
+        applied += 1
+        if checkpoint_path is not None and applied % checkpoint_every == 0:
+            output.flush()
+            save_checkpoint(oms, checkpoint_path, offset, output.tell())
+
+
+def run_with_checkpoints(input_filename, output_filename, checkpoint_path,
+                         checkpoint_every=DEFAULT_CHECKPOINT_EVERY, flush_size=DEFAULT_FLUSH_SIZE):
+
+    """
+    Like gatorDelivery.main, but save a checkpoint every checkpoint_every commands.
+    """
+    with open(output_filename, 'w', buffering=flush_size) as output, open(input_filename, 'rb') as f:
+        _apply_from(Ordersystem(output), f, 0, output, checkpoint_path, checkpoint_every)
+
+
+def resume(checkpoint_path, input_filename, output_filename,
+           checkpoint_every=DEFAULT_CHECKPOINT_EVERY, flush_size=DEFAULT_FLUSH_SIZE):
+
+    """
+    Restart a run from its last checkpoint.
+
+    The output file is cut back to the point the checkpoint was taken at, the state is loaded,
+    and the command log is replayed from the checkpoint's input offset, continuing to checkpoint.
+    """
+    with open(output_filename, 'r+', buffering=flush_size) as output, open(input_filename, 'rb') as f:
+        oms, input_offset, output_offset = load_checkpoint(checkpoint_path, output)
+        output.seek(output_offset)
+        output.truncate()
+        f.seek(input_offset)
+        _apply_from(oms, f, input_offset, output, checkpoint_path, checkpoint_every)
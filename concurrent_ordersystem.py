@@ -0,0 +1,131 @@
+"""
+Concurrent Ordersystem: a single writer applies the mutations, a thread pool answers the queries.
+
+The writer keeps a persistent Ordersystem (see PersistentAVLTree) and publishes an O(1) snapshot
+of it after every mutation. A query runs against the snapshot that was published when it was
+submitted, so it sees exactly the state it would see in sequential execution, while later
+mutations go ahead without waiting for it.
+"""
+import copy
+import io
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gatorDelivery import DEFAULT_FLUSH_SIZE, QUERY_COMMANDS, Ordersystem, get_handler, parse_command
+
+# number of query threads used by default
+DEFAULT_WORKERS = 4
+
+
+class ConcurrentOrdersystem:
+
+    """
+    Ordersystem whose query commands run concurrently with the mutations.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, metrics=None):
+
+        """
+        Initialize the writer state and the query thread pool.
+
+        Args:
+            workers: The number of threads answering queries.
+            metrics: Optional instrumentation.Metrics for the writer's Ordersystem.
+        """
+        self.oms = Ordersystem(None, metrics=metrics, persistent=True)
+        self.write_lock = threading.Lock()
+        self.published = self.oms.snapshot(None)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def apply(self, command, args):
+
+        """
+        Apply a mutating command and publish the resulting state.
+
+        Mutations from several threads are serialized.
+
+        Returns:
+            The output of the command.
+        """
+        handler = get_handler(command, args)
+        output = io.StringIO()
+        with self.write_lock:
+            self.oms.f = output
+            handler(self.oms, args)
+            self.published = self.oms.snapshot(None)
+        return output.getvalue()
+
+    def submit(self, command, args):
+
+        """
+        Execute a command, queries asynchronously on the thread pool.
+
+        A query is bound to the state published when it is submitted.
+
+        Returns:
+            A Future with the output of the command.
+        """
+        handler = get_handler(command, args)
+        if command not in QUERY_COMMANDS:
+            future = Future()
+            future.set_result(self.apply(command, args))
+            return future
+        return self.pool.submit(self._query, self.published, handler, args)
+
+    def _query(self, view, handler, args):
+
+        """
+        Run a query against a published snapshot and return its output.
+        """
+        # queries sharing a snapshot each get their own shallow copy to write to
+        view = copy.copy(view)
+        view.f = io.StringIO()
+        handler(view, args)
+        return view.f.getvalue()
+
+    def close(self):
+
+        """
+        Wait for the submitted queries and stop the thread pool.
+        """
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_concurrent(coms, lines, file, window=1024):
+
+    """
+    Execute command lines on a ConcurrentOrdersystem, writing the output in command order.
+
+    Args:
+        coms: The ConcurrentOrdersystem.
+        lines: Any iterable of command lines.
+        file: The file object the output is written to.
+        window: The largest number of commands whose output may be pending at a time.
+    """
+    pending = deque()
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+        command, args = parse_command(line)
+        pending.append(coms.submit(command, args))
+        while pending and (pending[0].done() or len(pending) > window):
+            file.write(pending.popleft().result())
+    while pending:
+        file.write(pending.popleft().result())
+
+
+def main(input_filename, output_filename, workers=DEFAULT_WORKERS, flush_size=DEFAULT_FLUSH_SIZE):
+
+    """
+    Like gatorDelivery.main, but answer the queries on a pool of worker threads.
+    """
+    with open(output_filename, 'w', buffering=flush_size) as file, open(input_filename, 'r') as f, \
+            ConcurrentOrdersystem(workers) as coms:
+        run_concurrent(coms, f, file)
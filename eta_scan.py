@@ -0,0 +1,60 @@
+"""
+Vectorized evaluation of the delivery queue's ETA recurrence.
+
+For the queued orders in priority order the driver is free again at
+
+    r_i = max(c_i, r_{i-1}) + 2 * d_i,    r_0 = the time the driver is free before the first order,
+
+and the order's ETA is eta_i = r_i - d_i. With S_i the prefix sum of 2 * d this is a max-plus
+prefix scan,
+
+    r_i = S_i + max(r_0, max_{j <= i}(c_j - S_{j-1})),
+
+which NumPy evaluates with a cumulative sum and a running maximum. Without NumPy the recurrence
+is evaluated in a plain loop.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def scan_etas(creation_times, delivery_times, driver_free):
+
+    """
+    Compute the ETAs of consecutive queued orders.
+
+    Args:
+        creation_times: The creation times of the orders in queue order.
+        delivery_times: The delivery times of the orders, aligned with creation_times.
+        driver_free: The time the driver is free before the first of the orders.
+
+    Returns:
+        A tuple (etas, driver_free): the list of ETAs and the time the driver is free after the last order.
+    """
+    if len(creation_times) == 0:
+        return [], driver_free
+    if np is None:
+        return _scan_etas_python(creation_times, delivery_times, driver_free)
+
+    creation = np.asarray(creation_times, dtype=np.int64)
+    delivery = np.asarray(delivery_times, dtype=np.int64)
+    round_trip = 2 * delivery
+    total = np.cumsum(round_trip)
+    free = total + np.maximum(driver_free, np.maximum.accumulate(creation - (total - round_trip)))
+    return (free - delivery).tolist(), int(free[-1])
+
+
+def _scan_etas_python(creation_times, delivery_times, driver_free):
+
+    """
+    Pure Python fallback of scan_etas.
+    """
+    etas = []
+    for creation_time, delivery_time in zip(creation_times, delivery_times):
+        eta = max(creation_time, driver_free) + delivery_time
+        driver_free = eta + delivery_time
+        etas.append(eta)
+    return etas, driver_free
@@ -1,5 +1,18 @@
-from avl_tree_implementation import AVLTree
-import copy
+from avl_tree_implementation import PersistentAVLTree
+from ordered_maps import BACKENDS
+from order_store import OrderStore
+from eta_scan import scan_etas
+from instrumentation import timed
+from itertools import islice
+import re
+
+# bytes of output buffered before they are written to the output file
+DEFAULT_FLUSH_SIZE = 1 << 20
+
+COMMAND_PATTERN = re.compile(r'\s*(\w+)\(([^)]*)\)\s*')
+
+# number of queued orders the vectorized ETA engine scans at first; the chunk doubles after every scan
+SCAN_CHUNK_SIZE = 64
 
 class Ordersystem:
 
@@ -7,28 +20,202 @@ class Ordersystem:
     Class representing an order management system.
     """
 
-    def __init__(self, file):
+    def __init__(self, file, metrics=None, debug=False, vectorized_eta=False, persistent=False, backend='avl'):
         
         """
         Initialize the order management system.
 
         Attributes:
-        - priority_avl: AVLTree object representing the AVL tree for order priorities with ETA as key.
-        - orders_avl: AVLTree object representing the AVL tree for orders with all meta information.
+        - priority_avl: Ordered map (an AVLTree by default) of order priorities with ETA as key.
+        - orders_avl: Ordered map (an AVLTree by default) of order IDs to the slots of their records in store.
+        - order_index: Dict from order_id to the slot of its record, for O(1) lookups by ID.
+        - store: OrderStore holding the records of all orders with all meta information in columns.
+        - eta_avl: Ordered map indexing the orders by (eta, order_id), used for ETA range queries.
         - current_system_time: Current system time.
         - first_order: Boolean indicating if it's the first order in the system.
         - driver_return_time: Time when the driver is expected to return.
         - last_order_eta: ETA of the last order.
+        - dirty_priorities: Priority keys where the queue changed since the ETAs were last recomputed.
+        - dirty_tail: Priority key from which every later ETA has to be recomputed, or None.
+        - metrics: Optional instrumentation.Metrics collecting handler timings and tree counters.
+        - debug: Whether the ETAs of all orders are dumped to the output after every command.
+        - vectorized_eta: Whether ETAs are recomputed in chunks with eta_scan.scan_etas (NumPy if installed)
+          instead of one order at a time.
+        - persistent: Whether the trees are PersistentAVLTrees and records are copied to new slots on write,
+          which makes snapshot() available.
+        - backend: Name of the ordered map implementation in ordered_maps.BACKENDS used for the three maps.
         """
-        self.priority_avl = AVLTree()
-        self.orders_avl = AVLTree()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}")
+        if persistent and backend != 'avl':
+            raise ValueError("Persistent mode requires the 'avl' backend")
+        tree_class = PersistentAVLTree if persistent else BACKENDS[backend]
+        self.priority_avl = tree_class(metrics=metrics)
+        self.orders_avl = tree_class(metrics=metrics)
+        self.eta_avl = tree_class(metrics=metrics)
+        self.order_index = {}
+        self.store = OrderStore(persistent=persistent)
+        self.persistent = persistent
+        self.metrics = metrics
+        self.debug = debug
+        self.vectorized_eta = vectorized_eta
         self.current_system_time = 0
         self.first_order = True
         self.driver_return_time = 0
         self.last_order_eta = 0
+        self.dirty_priorities = set()
+        self.dirty_tail = None
         self.f = file
 
-        
+    def func_store_order(self, order_id, creation_time, order_value, delivery_time, priority, eta, out_for_delivery):
+
+        """
+        Insert the record of a new order.
+
+        Args:
+        - order_id: The ID of the order.
+        - creation_time, order_value, delivery_time, priority, eta, out_for_delivery: The order's meta information.
+
+        Records are inserted here and afterwards only mutated in place; ETA changes go through
+        func_set_eta so that eta_avl stays in step with the stored ETAs.
+        """
+
+        old_slot = self.order_index.get(order_id)
+        if old_slot is not None:
+            self.eta_avl.remove((self.store.eta[old_slot], order_id))
+            self.store.release(old_slot)
+        slot = self.store.allocate(creation_time, order_value, delivery_time, priority, eta, out_for_delivery)
+        self.orders_avl.put(order_id, slot)
+        self.order_index[order_id] = slot
+        self.eta_avl.put((eta, order_id), order_id)
+
+    def func_load_orders(self, order_ids, columns, priorities, events=None):
+
+        """
+        Bulk load the records of new orders, e.g. from a snapshot or a backfill.
+
+        Args:
+        - order_ids: List of the order IDs in ascending order; the IDs must not be stored yet.
+        - columns: Dict from every field of order_store.FIELDS to the list of its values, aligned with order_ids.
+        - priorities: List of (priority, order_id) entries for priority_avl in ascending priority order.
+        - events: Optional list of the (eta, order_id) keys of the orders in ascending order, if already known.
+
+        The records are appended to the store column by column and the trees are built with
+        AVLTree.bulk_insert in linear time instead of one insert per order.
+        ETAs are loaded as given and not recomputed.
+        """
+
+        if events is None:
+            events = sorted(zip(columns['eta'], order_ids))
+        orders = list(zip(order_ids, self.store.extend(columns)))
+        self.orders_avl.bulk_insert(orders)
+        self.order_index.update(orders)
+        self.priority_avl.bulk_insert(priorities)
+        self.eta_avl.bulk_insert([(key, key[1]) for key in events])
+
+    def func_writable_order(self, order_id, slot):
+
+        """
+        Get a record of a stored order that may be modified in place.
+
+        Args:
+        - order_id: The ID of the order.
+        - slot: The slot of the stored record of the order.
+
+        Returns:
+        - slot itself, or in persistent mode the slot of a copy that replaces it in orders_avl, so that
+          snapshots keep seeing the old record.
+        """
+
+        if not self.persistent:
+            return slot
+        slot = self.store.copy(slot)
+        self.orders_avl.put(order_id, slot)
+        self.order_index[order_id] = slot
+        return slot
+
+    def snapshot(self, file):
+
+        """
+        Capture the current state in O(1) as a read-only Ordersystem.
+
+        Args:
+        - file: The file object the snapshot writes the output of its queries to.
+
+        Returns:
+        - An Ordersystem sharing the current versions of the trees. Read-only queries (func_single_print,
+          func_double_print, func_get_rak_of_order) on it are unaffected by later commands and can run in
+          another thread; commands must not be applied to it.
+
+        Raises:
+        - ValueError: If the Ordersystem was not created with persistent=True.
+        """
+
+        if not self.persistent:
+            raise ValueError("Snapshots require persistent=True")
+        view = Ordersystem(file, metrics=self.metrics, persistent=True)
+        view.priority_avl = self.priority_avl.snapshot()
+        view.orders_avl = self.orders_avl.snapshot()
+        # copying the index would take O(n), so the view looks records up in its frozen tree instead
+        view.order_index = view.orders_avl
+        # the view reads the shared store; its slots are not reused while the view is referenced
+        view.store = self.store
+        view.store_pin = self.store.pin()
+        view.eta_avl = self.eta_avl.snapshot()
+        view.current_system_time = self.current_system_time
+        view.first_order = self.first_order
+        view.driver_return_time = self.driver_return_time
+        view.last_order_eta = self.last_order_eta
+        view.dirty_priorities = set(self.dirty_priorities)
+        view.dirty_tail = self.dirty_tail
+        return view
+
+    def func_set_eta(self, order_id, slot, eta):
+
+        """
+        Change the ETA of a stored order in place.
+
+        Args:
+        - order_id: The ID of the order.
+        - slot: The slot of the stored record of the order.
+        - eta: The new ETA.
+
+        Returns:
+        - True if the ETA changed, False otherwise.
+        """
+
+        if self.store.eta[slot] == eta:
+            return False
+        if self.metrics is not None:
+            self.metrics.count('eta_updates')
+        self.eta_avl.remove((self.store.eta[slot], order_id))
+        slot = self.func_writable_order(order_id, slot)
+        self.store.eta[slot] = eta
+        self.eta_avl.put((eta, order_id), order_id)
+        return True
+
+    def func_remove_order(self, order_id, indexed=True):
+
+        """
+        Remove an order from all the AVL trees.
+
+        Args:
+        - order_id: The ID of the order.
+        - indexed: False if the order's entry has already been detached from eta_avl.
+
+        The record keeps the order's priority, which is the key of its entry in priority_avl,
+        so every tree is updated with a single O(log n) delete by key.
+        """
+
+        slot = self.order_index.pop(order_id)
+        self.orders_avl.remove(order_id)
+        priority = self.store.priority[slot]
+        if indexed:
+            self.eta_avl.remove((self.store.eta[slot], order_id))
+        self.store.release(slot)
+        if self.priority_avl.get(priority) == order_id:
+            self.priority_avl.remove(priority)
+            self.dirty_priorities.add(priority)
 
     def func_check_order_deliveries(self):
 
@@ -39,15 +226,139 @@ class Ordersystem:
         and updates the AVL trees accordingly.
         """
 
-        temp_lst_dict = self.priority_avl.getReverseSortedItems()
-        temp_lst = list(temp_lst_dict.values())
-        for item in temp_lst:
-            
-            if self.orders_avl.getNode(self.orders_avl.root, item)['eta'] < self.current_system_time:
-                #deleting the key from the dictionary
-                self.f.write(f"Order {item} has been delivered at time {self.orders_avl.getNode(self.orders_avl.root, item)['eta']}\n")
-                self.orders_avl.root = self.orders_avl.delete(self.orders_avl.root, item)
-                self.priority_avl.root = self.priority_avl.delete(self.priority_avl.root, list(temp_lst_dict.keys())[list(temp_lst_dict.values()).index(item)])
+        # nothing is due unless the earliest ETA has passed, which is the common case within a burst
+        # of orders created at the same time
+        first = self.eta_avl.min_item()
+        if first is None or first[0][0] >= self.current_system_time:
+            return
+
+        # detach every order with an ETA before the current time from the ETA index in O(log n)
+        due, self.eta_avl = self.eta_avl.split((self.current_system_time, float('-inf')))
+        if len(due) == 0:
+            return
+
+        # orders that lost their priority entry are never delivered, they go back into the index
+        delivered = []
+        kept = []
+        store = self.store
+        for key, item in due.iter_items():
+            slot = self.order_index.get(item)
+            if self.priority_avl.get(store.priority[slot]) == item:
+                delivered.append((store.priority[slot], item, store.eta[slot]))
+            else:
+                kept.append((key, item))
+        if kept:
+            tree_class = type(self.eta_avl)
+            self.eta_avl = tree_class.join(tree_class.from_sorted(kept, metrics=self.metrics), self.eta_avl)
+
+        # orders are reported in priority order, not in ETA order
+        delivered.sort(reverse=True)
+        self.f.write("".join(f"Order {item} has been delivered at time {eta}\n" for _, item, eta in delivered))
+        for _, item, _ in delivered:
+            self.func_remove_order(item, indexed=False)
+
+    def func_queue_state_before(self, priority):
+
+        """
+        Get the state the ETA recomputation has when it reaches a position in the queue.
+
+        Args:
+        - priority: The priority key of the position; it does not need to be in priority_avl.
+
+        Returns:
+        - A tuple (prev_end, skip_next): the time the driver is free after the queued order in front
+          of this position (the driver return time if there is none) and whether the order at this
+          position is kept in the queue even if it is out for delivery.
+        """
+
+        # only a run of orders out for delivery directly in front can change the state
+        store = self.store
+        run = []
+        previous_slot = None
+        for key, item in self.priority_avl.iter_from(priority):
+            if key == priority:
+                continue
+            slot = self.order_index.get(item)
+            if not store.out_for_delivery[slot]:
+                previous_slot = slot
+                break
+            run.append(slot)
+
+        # within such a run the 1st, 3rd, ... orders are dropped and the 2nd, 4th, ... kept
+        if len(run) >= 2:
+            previous_slot = run[0] if len(run) % 2 == 0 else run[1]
+        if previous_slot is None:
+            return self.driver_return_time, len(run) % 2 == 1
+        return store.eta[previous_slot] + store.delivery_time[previous_slot], len(run) % 2 == 1
+
+    def func_queued_orders(self, start, skip_next):
+
+        """
+        Iterate over the queued orders from a position in the queue downwards.
+
+        Args:
+        - start: The priority key to start at; it does not need to be in priority_avl.
+        - skip_next: The skip state at start, as returned by func_queue_state_before.
+
+        Yields:
+        - (priority, order_id, slot) tuples of the orders in the queue.
+        """
+
+        out_for_delivery = self.store.out_for_delivery
+        for priority, item in self.priority_avl.iter_from(start, reverse=True):
+            slot = self.order_index.get(item)
+            # orders out for delivery are dropped from the queue, except that an order directly
+            # behind a dropped one is always kept (the queue used to be filtered by removing
+            # items from the list while iterating over it, which skips the following item)
+            if not skip_next and out_for_delivery[slot]:
+                skip_next = True
+                continue
+            skip_next = False
+            yield priority, item, slot
+
+    def func_queue_etas(self, start, prev_end, skip_next):
+
+        """
+        Recompute the ETAs of the queued orders from a position in the queue downwards.
+
+        Args:
+        - start: The priority key to start at; it does not need to be in priority_avl.
+        - prev_end: The time the driver is free before the first order, see func_queue_state_before.
+        - skip_next: The skip state at start, see func_queue_state_before.
+
+        Yields:
+        - (priority, order_id, slot, eta) tuples with the recomputed ETA; the stored ETAs are not changed.
+        """
+
+        creation_time = self.store.creation_time
+        delivery_time = self.store.delivery_time
+        for priority, item, slot in self.func_queued_orders(start, skip_next):
+            # recaulculate the eta for the order
+            eta = max(creation_time[slot], prev_end) + delivery_time[slot]
+            prev_end = eta + delivery_time[slot]
+            yield priority, item, slot, eta
+
+    def func_scan_queue_etas(self, start, prev_end, skip_next):
+
+        """
+        Vectorized func_queue_etas: the queue is scanned in chunks with eta_scan.scan_etas.
+
+        The chunks start at SCAN_CHUNK_SIZE orders and double, so a caller that stops early after
+        a few orders scans at most about twice as many orders as it consumes.
+        """
+
+        queued = self.func_queued_orders(start, skip_next)
+        chunk_size = SCAN_CHUNK_SIZE
+        while True:
+            chunk = list(islice(queued, chunk_size))
+            if not chunk:
+                return
+            slots = [slot for _, _, slot in chunk]
+            etas, prev_end = scan_etas([self.store.creation_time[slot] for slot in slots],
+                                       [self.store.delivery_time[slot] for slot in slots], prev_end)
+            for (priority, item, slot), eta in zip(chunk, etas):
+                yield priority, item, slot, eta
+            chunk_size *= 2
 
     def func_update_eta(self, order_id):
 
@@ -60,56 +371,48 @@ class Ordersystem:
         This function updates the ETA for all orders available before the driver return from last delivery,
         in the AVL trees based on their priority and delivery time.
         If a specific order ID is provided, it also prints the ETA for that order and any updated ETAs for other orders.
+        Only the parts of the queue marked in dirty_priorities and dirty_tail are recomputed.
         """
 
-        #tmp_orders_priority_dict = 
-        # sorted dictionary given by avl tree, gaurantted upto 10k keys then best effort
-        #wierd = self.priority_avl.getReverseSortedItems()
-        tmp_orders_priority = list(self.priority_avl.getReverseSortedItems().values())
-        for item in tmp_orders_priority:
-            if self.orders_avl.getNode(self.orders_avl.root, item)['out_for_delivery']:
-                tmp_orders_priority.remove(item)
-
-        temp_old_dict = copy.deepcopy(self.orders_avl.getSortedItems())
-        # recaulculate the eta for all the orders
-        if len(tmp_orders_priority) >= 1:
-            item = tmp_orders_priority[0]
-            node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, item))
-            updated_eta = max(node['creation_time'], self.driver_return_time) \
-                                            + node['delivery_time']
-            
-            #updating the node with new eta 
-            node['eta'] = updated_eta
-            self.orders_avl.root = self.orders_avl.update(self.orders_avl.root, item, node)
+        # Only the stretches of the queue that were touched since the last call are walked,
+        # starting at each dirty position and stopping as soon as an ETA comes out unchanged,
+        # since every order behind it would then be recomputed to the same value as well.
+        starts = sorted(self.dirty_priorities, reverse=True)
+        if self.dirty_tail is not None:
+            starts = sorted(set(starts) | {self.dirty_tail}, reverse=True)
 
-            for item in tmp_orders_priority[1:]:
+        updated_etas = []
+        idx = 0
+        while idx < len(starts):
+            start = starts[idx]
+            idx += 1
+            prev_end, skip_next = self.func_queue_state_before(start)
+            if self.vectorized_eta:
+                queue = self.func_scan_queue_etas(start, prev_end, skip_next)
+            else:
+                queue = self.func_queue_etas(start, prev_end, skip_next)
 
-                previous_itm = tmp_orders_priority[tmp_orders_priority.index(item) - 1]
-                previous_node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, previous_itm))
-                current_node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, item))
-                
-                current_node['eta'] = max(
-                    current_node['creation_time'], previous_node['eta'] + previous_node['delivery_time']
-                ) + current_node['delivery_time']
-                
-                #updating the node with new_eta
-                self.orders_avl.root = self.orders_avl.update(self.orders_avl.root, item, current_node)
+            for priority, item, slot, eta in queue:
+                while idx < len(starts) and starts[idx] >= priority:
+                    idx += 1
 
-        updated_etas = []
+                if self.func_set_eta(item, slot, eta):
+                    if item != order_id:
+                        updated_etas.append("{}:{}".format(item, eta))
+                elif not self.store.out_for_delivery[slot] and (self.dirty_tail is None or priority > self.dirty_tail):
+                    break
 
-        if order_id != -100:
-            self.f.write("Order {} has been created - ETA: {}\n".format(order_id, self.orders_avl.getNode(self.orders_avl.root, order_id)['eta']))
+        self.dirty_priorities = set()
+        self.dirty_tail = None
 
-        tmp_orders_priority.remove(order_id) if order_id != -100 else None
-        for item in tmp_orders_priority:
+        if order_id != -100:
+            self.f.write("Order {} has been created - ETA: {}\n".format(order_id, self.store.eta[self.order_index.get(order_id)]))
 
-            if self.orders_avl.getNode(self.orders_avl.root, item)['eta'] != temp_old_dict[item]['eta']:
-                updated_etas.append("{}:{}".format(item, self.orders_avl.getNode(self.orders_avl.root, item)['eta']))
-        
         if len(updated_etas) > 0:
 
             self.f.write("Updated ETAs: [{}]\n".format(",".join(updated_etas )))
 
+    @timed
     def func_create_order(self, order_id, creation_time, order_value, delivery_time):
 
         """
@@ -136,15 +439,9 @@ class Ordersystem:
             self.last_order_eta = eta
             self.f.write("Order {} has been created - ETA: {}\n".format(order_id, eta))
 
-            new_value = {'creation_time': creation_time, 
-                                'order_value': order_value, 
-                                'delivery_time': delivery_time, 
-                                'priority': priority, 
-                                'eta': eta, 
-                                'out_for_delivery': out_for_delivery}
-            
-            self.priority_avl.root = self.priority_avl.insert(self.priority_avl.root, priority, order_id)
-            self.orders_avl.root = self.orders_avl.insert(self.orders_avl.root, order_id, new_value)
+            self.priority_avl.put(priority, order_id)
+            self.func_store_order(order_id, creation_time, order_value, delivery_time, priority, eta, out_for_delivery)
+            self.dirty_priorities.add(priority)
             
             #temp = self.orders_avl.getSortedItems()
             
@@ -156,15 +453,9 @@ class Ordersystem:
             out_for_delivery = False
 
 
-            new_value = {'creation_time': creation_time, 
-                                'order_value': order_value, 
-                                'delivery_time': delivery_time, 
-                                'priority': priority, 
-                                'eta': eta, 
-                                'out_for_delivery': out_for_delivery}
-            
-            self.orders_avl.root = self.orders_avl.insert(self.orders_avl.root, order_id, new_value)
-            self.priority_avl.root = self.priority_avl.insert(self.priority_avl.root, priority, order_id)
+            self.func_store_order(order_id, creation_time, order_value, delivery_time, priority, eta, out_for_delivery)
+            self.priority_avl.put(priority, order_id)
+            self.dirty_priorities.add(priority)
             
             # queue all orders untill the driver returns
             #temp = self.orders_avl.getSortedItems()
@@ -174,18 +465,20 @@ class Ordersystem:
             self.func_check_order_deliveries()
 
             # PUSHING ORDERS FOR DELIVERY
-            if self.current_system_time > self.driver_return_time and self.priority_avl.getNumberOfNodes() >= 1:
+            if self.current_system_time > self.driver_return_time and len(self.priority_avl) >= 1:
                 
-                next_order = list(self.priority_avl.getReverseSortedItems().values())[0]
-                node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, next_order))
-                node['out_for_delivery'] = True
-                self.driver_return_time = node['eta'] + node['delivery_time']
-                self.last_order_eta = node['eta']
-                self.orders_avl.root = self.orders_avl.update(self.orders_avl.root, next_order, node)
+                _, next_order = next(self.priority_avl.iter_reverse())
+                slot = self.func_writable_order(next_order, self.order_index.get(next_order))
+                self.store.out_for_delivery[slot] = True
+                self.driver_return_time = self.store.eta[slot] + self.store.delivery_time[slot]
+                self.last_order_eta = self.store.eta[slot]
+                # the driver return time moved, so the whole queue has to be revisited from the front
+                self.dirty_priorities.add(float('inf'))
 
         #print ETAs of all orders
         self.func_print_eta()
 
+    @timed
     def func_cancel_order(self, order_id, current_system_time):
 
         """
@@ -201,22 +494,21 @@ class Ordersystem:
         It also checks for order deliveries and updates the ETAs if necessary.
         """
 
-        if self.orders_avl.getNode(self.orders_avl.root, order_id) is None:
+        slot = self.order_index.get(order_id)
+        if slot is None:
             self.f.write(f"Cannot cancel. Order {order_id} has already been delivered.\n")
 
-        elif self.orders_avl.getNode(self.orders_avl.root, order_id)['out_for_delivery']:
+        elif self.store.out_for_delivery[slot]:
             self.f.write(f"Order {order_id} is out for delivery\n")
 
-        elif not self.orders_avl.getNode(self.orders_avl.root, order_id)['out_for_delivery']:
+        else:
             self.f.write(f"Order {order_id} has been canceled\n")
-            self.orders_avl.root = self.orders_avl.delete(self.orders_avl.root, order_id)
-
-            temp_orders_dict = self.priority_avl.getReverseSortedItems()
-            self.priority_avl.root = self.priority_avl.delete(self.priority_avl.root, list(temp_orders_dict.keys())[list(temp_orders_dict.values()).index(order_id)] )
+            self.func_remove_order(order_id)
             self.func_update_eta(-100)
 
         self.func_print_eta()
 
+    @timed
     def func_update_time(self, order_id, current_system_time, new_delivery_time):
 
         """
@@ -231,44 +523,47 @@ class Ordersystem:
         It also checks for order deliveries and updates the ETAs if necessary.
         """
         
-        if self.orders_avl.getNode(self.orders_avl.root, order_id) is None:
+        store = self.store
+        slot = self.order_index.get(order_id)
+        if slot is None:
             self.f.write(f"Order {order_id} has already been delivered\n")
-        elif self.orders_avl.getNode(self.orders_avl.root, order_id)['out_for_delivery']:
+        elif store.out_for_delivery[slot]:
             self.f.write(f"Order {order_id} is out for delivery\n")
-        elif not self.orders_avl.getNode(self.orders_avl.root, order_id)['out_for_delivery']:
+        else:
             
-            temp_old_dict = copy.deepcopy(self.orders_avl.getSortedItems())
-            update_flg = False
-
-            orders_priority = list(self.priority_avl.getReverseSortedItems().values())
-
-            for item in orders_priority:
-                if item == order_id:
-                    node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, item))
-                    node['eta'] = node['eta'] - node['delivery_time'] + new_delivery_time
-                    node['delivery_time'] = new_delivery_time
-                    self.orders_avl.root = self.orders_avl.update(self.orders_avl.root, item, node)
-                    update_flg = True
-                elif update_flg:
-                    prev_order = orders_priority[orders_priority.index(item)-1]
-                    prev_node = self.orders_avl.getNode(self.orders_avl.root, prev_order)
-                    current_node = copy.deepcopy(self.orders_avl.getNode(self.orders_avl.root, item))
-                    current_node['eta'] = prev_node['eta'] + prev_node['delivery_time'] + current_node['delivery_time']
-                    self.orders_avl.root = self.orders_avl.update(self.orders_avl.root, item, current_node)
-                    #self.orders_dict[item]['delivery_time'] = new_delivery_time
-            # you will just update the ETA, priorrity will remain the same
-            # self.orders_priority.sort(key=lambda x: self.orders_dict[x]['priority'], reverse=True)
-
             lst_up_eta = []
-            for item in orders_priority:
-                if self.orders_avl.getNode(self.orders_avl.root, item)['eta'] != temp_old_dict[item]['eta']:
-                    lst_up_eta.append("{}:{}".format(item, self.orders_avl.getNode(self.orders_avl.root, item)['eta']))
+            prev_eta = None
+            prev_delivery_time = None
+
+            # only the order itself and the orders behind it in priority can change,
+            # so walk the tree from the order's priority downwards
+            priority = store.priority[slot]
+            for _, item in self.priority_avl.iter_from(priority, reverse=True):
+                slot = self.order_index.get(item)
+                if prev_eta is None:
+                    if item != order_id:
+                        break
+                    eta = store.eta[slot] - store.delivery_time[slot] + new_delivery_time
+                    slot = self.func_writable_order(item, slot)
+                    store.delivery_time[slot] = new_delivery_time
+                else:
+                    eta = prev_eta + prev_delivery_time + store.delivery_time[slot]
+                # you will just update the ETA, priorrity will remain the same
+                if self.func_set_eta(item, slot, eta):
+                    lst_up_eta.append("{}:{}".format(item, eta))
+                prev_eta = eta
+                prev_delivery_time = store.delivery_time[slot]
+
+            # the chain above ignores creation times, so the next recomputation has to revisit it
+            if prev_eta is not None and (self.dirty_tail is None or priority > self.dirty_tail):
+                self.dirty_tail = priority
 
             if len(lst_up_eta) > 0:
                 self.f.write("Updated ETAs: [{}]\n".format(",".join(lst_up_eta )))
 
         self.func_print_eta()
 
+    @timed
     def func_double_print(self, time1, time2):
         """
         Prints the orders within the specified time range.
@@ -284,13 +579,15 @@ class Ordersystem:
             - The list of orders within the specified time range which WILL BE delivered but the delivered orders are not printed.
             - "There are no orders in that time period" if there are no orders in the time range.
         """
+        # only the orders inside the window are visited, then reported in priority order
         temp = []
-        for item in self.priority_avl.getReverseSortedItems().values():
-            node = self.orders_avl.getNode(self.orders_avl.root, item)
-            if node['eta'] >= time1 and node['eta'] <= time2:
-                temp.append(item)
+        for _, item in self.eta_avl.range((time1, float('-inf')), (time2, float('inf'))):
+            priority = self.store.priority[self.order_index.get(item)]
+            if self.priority_avl.get(priority) == item:
+                temp.append((priority, item))
+        temp.sort(reverse=True)
         if len(temp) > 0:
-            self.f.write( "[" + ",".join(map(str, temp)) + "]")
+            self.f.write( "[" + ",".join(str(item) for _, item in temp) + "]")
             self.f.write("\n")
         else:
             self.f.write("There are no orders in that time period\n")
@@ -305,112 +602,213 @@ class Ordersystem:
         AVL tree node using the `orders_avl` attribute.
 
         Note:
-        - If the `DEBUG` flag is set to True, the method will print the eta values.
-        - If the `DEBUG` flag is set to False, the method will do nothing.
+        - If the `debug` attribute is set to True, the method will print the eta values.
+        - If the `debug` attribute is set to False, the method will do nothing.
 
         Example usage:
         ```
-        tree = AVLTree()
-        tree.func_print_eta()
+        oms = Ordersystem(file, debug=True)
+        oms.func_print_eta()
         ```
 
         """
-        DEBUG = False
-        if DEBUG:
+        if self.debug:
             tmp_str = ''
-            for item in self.orders_avl.getSortedItems():
-                tmp_str = tmp_str +  " {}:{} | ".format(item, self.orders_avl.getNode(self.orders_avl.root,item)['eta'])
+            for item, slot in self.orders_avl.iter_items():
+                tmp_str = tmp_str +  " {}:{} | ".format(item, self.store.eta[slot])
             self.f.write("\n--------------------")
             self.f.write(tmp_str)
             self.f.write("--------------------\n")
         else:
             pass
 
+    @timed
     def func_single_print(self, order_id):
 
         """
         Print the details of a single order.
         """
 
-        if order_id in self.orders_avl.getSortedItems():
-            node = self.orders_avl.getNode(self.orders_avl.root, order_id)
-            self.f.write( "[" + ",".join( map(str, [order_id, node['creation_time'],
-                    node['order_value'],
-                      node['delivery_time'],
-                         node['eta']])) + "]")
+        slot = self.order_index.get(order_id)
+        if slot is not None:
+            self.f.write( "[" + ",".join( map(str, [order_id, self.store.creation_time[slot],
+                    self.store.order_value[slot],
+                      self.store.delivery_time[slot],
+                         self.store.eta[slot]])) + "]")
             self.f.write("\n")
         else:
             self.f.write("dude you have the deleted the info\n")
 
+    @timed
     def func_get_rak_of_order(self, order_id):
         
         """
         Get the rank of an order in the AVL tree for the given order_id.
         """
 
-        lst_orders = list(self.priority_avl.getReverseSortedItems().values())
-        if order_id in lst_orders:
-            self.f.write("Order {} will be delivered after {} orders.\n".format(order_id, lst_orders.index(order_id)))
+        slot = self.order_index.get(order_id)
+        if slot is not None and self.priority_avl.get(self.store.priority[slot]) == order_id:
+            # orders are delivered in decreasing priority, so the rank is the number of larger keys
+            orders_ahead = len(self.priority_avl) - 1 - self.priority_avl.rank(self.store.priority[slot])
+            self.f.write("Order {} will be delivered after {} orders.\n".format(order_id, orders_ahead))
         else:
             #self.f.write("Order not found")
             pass
 
+    @timed
     def func_deliver_remainig_orders(self):
 
         """ Once the program recieves quit command, it delivers all the remaining orders in the AVL tree """
 
-        lst_orders = list(self.priority_avl.getReverseSortedItems().values())
-        for item in lst_orders:
-            self.f.write(f"Order {item} has been delivered at time {self.orders_avl.getNode(self.orders_avl.root, item)['eta']}\n")
+        for _, item in self.priority_avl.iter_reverse():
+            self.f.write(f"Order {item} has been delivered at time {self.store.eta[self.order_index.get(item)]}\n")
             #del self.orders_dict[item]
 
+        # every order has been delivered, so the trees are dropped whole instead of node by node
+        self.priority_avl.clear()
+        self.orders_avl.clear()
+        self.order_index.clear()
+        self.store.clear()
+        self.eta_avl.clear()
+
+    def apply_batch(self, commands):
+
+        """
+        Apply a batch of parsed commands.
+
+        Args:
+        - commands: List of (command, args) tuples as returned by parse_command, in input order.
+
+        The names and argument counts of the whole batch are checked with get_handler before any
+        command is applied, so a malformed command leaves the state untouched; a command that fails
+        while it runs still leaves the earlier commands of the batch applied. run_commands applies
+        the same checks, so both accept the same input, and the output is byte-identical to
+        applying the commands one at a time: createOrder, cancelOrder and updateTime report the
+        ETAs each of them changed, so the ETA recomputation stays per command (it only walks the
+        stretch of the queue whose ETAs change).
+        Within a burst of orders created at the same time, the delivery check after the first
+        order finds nothing due and returns after a single O(log n) lookup.
+        """
+
+        handlers = [get_handler(command, args) for command, args in commands]
+        for handler, (_, args) in zip(handlers, commands):
+            handler(self, args)
+
 
 
 
-def main(input_filename, output_filename):
+def parse_command(line):
 
     """
-    Main function to read the input file and call the respective functions.
+    Parse a command line such as "createOrder(1001, 1, 100, 4)".
+
+    Returns:
+    - A tuple (command, args) where args is the list of integer arguments.
+    """
+
+    match = COMMAND_PATTERN.fullmatch(line)
+    if match is None:
+        raise ValueError("Invalid command")
+    command, args = match.groups()
+    if len(args.strip()) > 0:
+        return command, list(map(int, args.split(',')))
+    return command, []
+
+
+# maps each command name to the Ordersystem handler that executes it
+COMMANDS = {
+    'createOrder': lambda oms, args: oms.func_create_order(args[0], args[1], args[2], args[3]),
+    'print': lambda oms, args: oms.func_single_print(args[0]) if len(args) == 1 else oms.func_double_print(args[0], args[1]),
+    'getRankOfOrder': lambda oms, args: oms.func_get_rak_of_order(args[0]),
+    'updateTime': lambda oms, args: oms.func_update_time(args[0], args[1], args[2]),
+    'cancelOrder': lambda oms, args: oms.func_cancel_order(args[0], args[1]),
+    'Quit': lambda oms, args: oms.func_deliver_remainig_orders(),
+}
+
+# commands that only read the state and write output
+QUERY_COMMANDS = {'print', 'getRankOfOrder'}
+
+# the numbers of arguments each command accepts
+ARGUMENT_COUNTS = {
+    'createOrder': {4},
+    'print': {1, 2},
+    'getRankOfOrder': {1},
+    'updateTime': {3},
+    'cancelOrder': {2},
+    'Quit': {0},
+}
+
+
+def get_handler(command, args):
+
+    """
+    Look up the handler of a parsed command and check its number of arguments.
+
+    Returns:
+    - The handler in COMMANDS.
+
+    Raises:
+    - ValueError: If the command is unknown or has the wrong number of arguments.
     """
 
-    file = open(output_filename, 'w')
-    oms =  Ordersystem(file)
+    handler = COMMANDS.get(command)
+    if handler is None or len(args) not in ARGUMENT_COUNTS[command]:
+        raise ValueError("Invalid command")
+    return handler
 
-    with open(input_filename, 'r') as f:
-        lines = f.readlines()
+
+def run_commands(oms, lines):
+
+    """
+    Execute command lines one by one against an Ordersystem.
+
+    Args:
+    - oms: The Ordersystem to execute the commands on.
+    - lines: Any iterable of command lines; it is consumed lazily, so a file object is streamed.
+    """
 
     for line in lines:
-        line = line.strip()
-        command, args = line.split('(')
-        args = args[:-1]
-        if len(args) > 0:
-            args = [int(item) for item in args.split(',')]
-        if command == 'createOrder':
-            oms.func_create_order(args[0], args[1], args[2], args[3])
-        elif command == 'print':
-        
-            if len(args) == 1:
-                oms.func_single_print(args[0])
-            else:
-                oms.func_double_print(args[0], args[1])
+        if len(line.strip()) == 0:
+            continue
+        command, args = parse_command(line)
+        get_handler(command, args)(oms, args)
 
-        elif command == 'getRankOfOrder':
-            oms.func_get_rak_of_order(args[0])
 
-        elif command == 'updateTime':
-            oms.func_update_time(args[0], args[1], args[2])
+def run_batches(oms, lines, batch_size):
 
-        elif command == 'cancelOrder':
-            oms.func_cancel_order(args[0], args[1])
+    """
+    Execute command lines in batches of batch_size commands with Ordersystem.apply_batch.
+    """
 
-        elif command == 'Quit':
-            oms.func_deliver_remainig_orders()
+    batch = []
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+        batch.append(parse_command(line))
+        if len(batch) >= batch_size:
+            oms.apply_batch(batch)
+            batch = []
+    if batch:
+        oms.apply_batch(batch)
 
-        else:
-            raise ValueError("Invalid command")
-    file.close()
 
+def main(input_filename, output_filename, flush_size=DEFAULT_FLUSH_SIZE, metrics=None, batch_size=None, backend='avl'):
+
+    """
+    Main function to read the input file and call the respective functions.
+
+    The input is streamed line by line and the output is buffered, flushing every flush_size bytes.
+    Pass an instrumentation.Metrics as metrics to collect timings and counters for the run.
+    With a batch_size the commands are applied in batches of that many commands.
+    backend selects the ordered map implementation, see ordered_maps.BACKENDS.
+    """
 
+    with open(output_filename, 'w', buffering=flush_size) as file, open(input_filename, 'r') as f:
+        oms = Ordersystem(file, metrics=metrics, backend=backend)
+        if batch_size:
+            run_batches(oms, f, batch_size)
+        else:
+            run_commands(oms, f)
 
 
 if __name__ == "__main__":
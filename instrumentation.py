@@ -0,0 +1,109 @@
+import time
+
+
+class Metrics:
+
+    """
+    Opt-in counters and timing histograms for Ordersystem and AVLTree.
+
+    A Metrics object is passed to Ordersystem (or AVLTree) to enable instrumentation;
+    without one the instrumented code paths are skipped after a single None check.
+
+    Counters:
+    - rotations: left and right rotations performed while rebalancing.
+    - node_visits: nodes visited by insert, delete and getNode.
+    - traversals: ordered traversals started (iter_items, iter_reverse, iter_from, range, ...).
+    - eta_updates: stored order ETAs that changed.
+
+    Timings are recorded per command handler in histograms with power-of-two microsecond buckets.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.totals = {}
+        self.hooks = []
+
+    def count(self, name, n=1):
+
+        """
+        Increase a counter by n.
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+
+        """
+        Record a duration for name and pass it on to the registered hooks.
+
+        Args:
+            name: The name of the timed operation, e.g. "func_create_order".
+            seconds: The elapsed time in seconds.
+        """
+        # bucket b holds durations below 2 ** b microseconds
+        bucket = 1 << int(seconds * 1e6).bit_length()
+        histogram = self.histograms.setdefault(name, {})
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+        count, total = self.totals.get(name, (0, 0.0))
+        self.totals[name] = (count + 1, total + seconds)
+
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def add_hook(self, callback):
+
+        """
+        Register a callback(name, seconds) that is called for every recorded duration.
+        """
+        self.hooks.append(callback)
+
+    def remove_hook(self, callback):
+
+        """
+        Unregister a callback added with add_hook.
+        """
+        self.hooks.remove(callback)
+
+    def snapshot(self):
+
+        """
+        Get a JSON-serializable copy of the current counters and timings.
+
+        Returns:
+            A dictionary with "counters", "timings" (count and total seconds per name) and
+            "histograms" (count per bucket upper bound in microseconds, per name).
+        """
+        return {'counters': dict(self.counters),
+                'timings': {name: {'count': count, 'total_seconds': total}
+                            for name, (count, total) in self.totals.items()},
+                'histograms': {name: {f'<{bucket}us': n for bucket, n in sorted(histogram.items())}
+                               for name, histogram in self.histograms.items()}}
+
+    def reset(self):
+
+        """
+        Clear all counters and timings, keeping the hooks.
+        """
+        self.counters.clear()
+        self.histograms.clear()
+        self.totals.clear()
+
+
+def timed(handler):
+
+    """
+    Decorator for Ordersystem command handlers that reports their duration to self.metrics.
+    """
+    def wrapper(self, *args):
+        if self.metrics is None:
+            return handler(self, *args)
+        start = time.perf_counter()
+        try:
+            return handler(self, *args)
+        finally:
+            self.metrics.observe(handler.__name__, time.perf_counter() - start)
+
+    wrapper.__name__ = handler.__name__
+    wrapper.__doc__ = handler.__doc__
+    return wrapper
@@ -0,0 +1,244 @@
+"""
+Write-ahead command journal for Ordersystem.
+
+Every accepted command is appended to the journal before it is applied. Appends are buffered and
+made durable in groups (one write and one fsync per group_size commands), so a crash loses at most
+the last uncommitted group. Recovery loads the latest checkpoint, if any, and replays the journal
+from the checkpoint's offset. The output file is cut back to the checkpoint's output offset and
+the replayed commands write their output to it again.
+
+A record is the byte offset in the input file just past the command, a space and the command line.
+The offset lets a restart with the same input file resume after the last journaled command.
+"""
+import os
+
+from checkpoint import load_checkpoint, save_checkpoint, DEFAULT_CHECKPOINT_EVERY
+from gatorDelivery import DEFAULT_FLUSH_SIZE, QUERY_COMMANDS, Ordersystem, get_handler, parse_command
+
+# number of commands made durable together by one fsync
+DEFAULT_GROUP_SIZE = 256
+
+
+class CommandJournal:
+
+    """
+    Append-only command log with group commit.
+    """
+
+    def __init__(self, path, group_size=DEFAULT_GROUP_SIZE):
+
+        """
+        Open (or create) a journal for appending.
+
+        Args:
+            path: The journal file.
+            group_size: The number of appended commands after which the group is committed.
+        """
+        self.file = open(path, 'ab')
+        self.group_size = group_size
+        self.pending = []
+        # byte offset of the end of the committed journal
+        self.offset = self.file.tell()
+
+    def append(self, line, input_offset):
+
+        """
+        Append a command line to the journal, committing the group once it is full.
+
+        Args:
+            line: The command line.
+            input_offset: The byte offset in the input file just past the command.
+        """
+        self.pending.append(b"%d %s\n" % (input_offset, line.encode()))
+        if len(self.pending) >= self.group_size:
+            self.commit()
+
+    def commit(self):
+
+        """
+        Write the pending commands and fsync them to disk.
+        """
+        if not self.pending:
+            return
+        data = b"".join(self.pending)
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.offset += len(data)
+        self.pending.clear()
+
+    def close(self):
+
+        """
+        Commit the pending commands and close the journal.
+        """
+        self.commit()
+        self.file.close()
+
+
+class NullOutput:
+
+    """
+    Output sink that discards everything written to it, used while replaying.
+    """
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def parse_record(raw):
+
+    """
+    Split a journal record into its input offset and command line.
+
+    Returns:
+        A tuple (input_offset, line); input_offset is None for records of journals written before
+        the input offset was recorded.
+    """
+    head, _, line = raw.decode().partition(' ')
+    if head.isdigit():
+        return int(head), line
+    return None, raw.decode()
+
+
+def replay(path, oms, offset=0, queries=False):
+
+    """
+    Re-apply the commands of a journal to an Ordersystem.
+
+    A command that raised when it was first applied is journaled as well; it raises again on
+    replay and is skipped, after changing the state exactly as much as it did the first time.
+
+    Args:
+        path: The journal file.
+        oms: The Ordersystem to apply the commands to.
+        offset: The byte offset to start replaying from.
+        queries: Whether queries are replayed too; they only write output, so without an output
+            to regenerate they are skipped.
+
+    Returns:
+        A tuple (offset, input_offset): the byte offset just past the last complete record (a torn
+        final record is ignored) and the input offset of that record, or None if none was replayed.
+    """
+    input_offset = None
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            input_offset, line = parse_record(raw)
+            command, args = parse_command(line)
+            if command in QUERY_COMMANDS and not queries:
+                continue
+            try:
+                get_handler(command, args)(oms, args)
+            except Exception:
+                # the command failed the same way in the original run, which then stopped
+                pass
+    return offset, input_offset
+
+
+def last_input_offset(path, offset):
+
+    """
+    Get the input offset of the last complete record before a byte offset of a journal.
+
+    Returns:
+        The input offset, or 0 if there is no such record.
+    """
+    with open(path, 'rb') as f:
+        start = max(0, offset - 4096)
+        f.seek(start)
+        records = f.read(offset - start).split(b"\n")[:-1]
+    # a record longer than the tail read is only a fragment unless the read started at 0
+    for raw in reversed(records if start == 0 else records[1:]):
+        input_offset, _ = parse_record(raw)
+        if input_offset is not None:
+            return input_offset
+    return 0
+
+
+def recover(journal_path, checkpoint_path=None, file=None):
+
+    """
+    Rebuild the Ordersystem state after a restart.
+
+    Args:
+        journal_path: The journal of all applied commands.
+        checkpoint_path: Optional checkpoint whose input offset is a position in the journal and
+            whose output offset is a position in the output file.
+        file: Optional output file of the journaled run, opened for reading and writing. It is cut
+            back to the checkpoint's output offset and the replayed commands write their output to
+            it again, so it holds the complete output; the recovered Ordersystem writes to it
+            afterwards. Without it nothing is written.
+
+    Returns:
+        A tuple (oms, offset, input_offset): the recovered Ordersystem, the end of the replayed journal
+        and the byte offset in the input file just past the last journaled command (0 if there is none).
+    """
+    output = file if file is not None else NullOutput()
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        oms, offset, output_offset = load_checkpoint(checkpoint_path, output)
+    else:
+        oms, offset, output_offset = Ordersystem(output), 0, 0
+    if file is not None:
+        file.seek(output_offset)
+        file.truncate()
+
+    input_offset = 0
+    if os.path.exists(journal_path):
+        offset, input_offset = replay(journal_path, oms, offset, queries=file is not None)
+        if input_offset is None:
+            input_offset = last_input_offset(journal_path, offset)
+    return oms, offset, input_offset
+
+
+def run_journaled(input_filename, output_filename, journal_path, checkpoint_path=None,
+                  checkpoint_every=DEFAULT_CHECKPOINT_EVERY, group_size=DEFAULT_GROUP_SIZE,
+                  flush_size=DEFAULT_FLUSH_SIZE):
+
+    """
+    Like gatorDelivery.main, but journal every command before applying it.
+
+    A journal belongs to one input file and one output file. If the journal or checkpoint already
+    exist, the state and the output are recovered from them first and the input is resumed after
+    the last journaled command. With a checkpoint_path a checkpoint is taken every
+    checkpoint_every commands, which bounds the part of the journal to replay. Commands are checked
+    with get_handler before they are journaled, so an invalid command raises ValueError without
+    reaching the journal.
+    """
+    # the output is kept and cut back to the recovered point by recover
+    mode = 'r+' if os.path.exists(output_filename) else 'w'
+    with open(output_filename, mode, buffering=flush_size) as output, open(input_filename, 'rb') as f:
+        oms, offset, input_offset = recover(journal_path, checkpoint_path, output)
+        f.seek(input_offset)
+        with open(journal_path, 'ab') as journal_file:
+            # drop a torn record left behind by a crash before appending to the journal
+            journal_file.truncate(offset)
+        journal = CommandJournal(journal_path, group_size)
+
+        try:
+            applied = 0
+            for raw in f:
+                input_offset += len(raw)
+                line = raw.decode().strip()
+                if len(line) == 0:
+                    continue
+                command, args = parse_command(line)
+                handler = get_handler(command, args)
+
+                journal.append(line, input_offset)
+                handler(oms, args)
+
+                applied += 1
+                if checkpoint_path is not None and applied % checkpoint_every == 0:
+                    journal.commit()
+                    output.flush()
+                    os.fsync(output.fileno())
+                    save_checkpoint(oms, checkpoint_path, journal.offset, output.tell())
+        finally:
+            journal.close()
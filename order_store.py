@@ -0,0 +1,187 @@
+"""
+Columnar storage for the order records of an Ordersystem.
+
+Every field of an order lives in its own typed array, and an order is identified by its slot,
+the index shared by all the columns. Slots of removed orders go on a free list and are reused
+by later orders, so the columns only grow with the peak number of stored orders. A column can
+be viewed as a NumPy array without copying, e.g. numpy.frombuffer(store.eta, dtype=numpy.int64),
+for vectorized scans.
+
+In persistent mode the slot of an order is never written once a snapshot may see it: changes go
+to a copy in a fresh slot, and retired slots are only reused after every snapshot pinned before
+their retirement has been dropped.
+"""
+import threading
+import weakref
+from array import array
+from collections import deque
+
+# field name and array typecode of every column, in the order of the arguments of allocate
+FIELDS = (
+    ('creation_time', 'q'),
+    ('order_value', 'q'),
+    ('delivery_time', 'q'),
+    ('priority', 'd'),
+    ('eta', 'q'),
+    ('out_for_delivery', 'b'),
+)
+
+
+class _Pin:
+
+    """
+    Keeps the slots visible to one snapshot from being reused while it is referenced.
+    """
+
+    __slots__ = ('__weakref__',)
+
+
+class OrderStore:
+
+    """
+    Struct-of-arrays store of order records, addressed by slot.
+
+    Attributes:
+    - creation_time, order_value, delivery_time, priority, eta, out_for_delivery: The columns.
+    - free: Slots that can be reused.
+    - persistent: Whether slots are retired instead of freed, see copy and release.
+    """
+
+    def __init__(self, persistent=False):
+        for name, typecode in FIELDS:
+            setattr(self, name, array(typecode))
+        self.free = []
+        self.persistent = persistent
+        # (epoch, slot) pairs of retired slots, in retirement order
+        self.retired = deque()
+        # number of pins taken so far, and the number of live pins for every epoch
+        self.epoch = 0
+        self.pins = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+
+        """
+        Number of slots in use.
+        """
+        return len(self.eta) - len(self.free) - len(self.retired)
+
+    def allocate(self, creation_time, order_value, delivery_time, priority, eta, out_for_delivery):
+
+        """
+        Store a new record.
+
+        Returns:
+            The slot of the record.
+        """
+        if not self.free and self.retired:
+            self.reclaim()
+        if self.free:
+            slot = self.free.pop()
+            self.creation_time[slot] = creation_time
+            self.order_value[slot] = order_value
+            self.delivery_time[slot] = delivery_time
+            self.priority[slot] = priority
+            self.eta[slot] = eta
+            self.out_for_delivery[slot] = out_for_delivery
+            return slot
+        self.creation_time.append(creation_time)
+        self.order_value.append(order_value)
+        self.delivery_time.append(delivery_time)
+        self.priority.append(priority)
+        self.eta.append(eta)
+        self.out_for_delivery.append(out_for_delivery)
+        return len(self.eta) - 1
+
+    def extend(self, columns):
+
+        """
+        Store many records at once.
+
+        Args:
+            columns: Dict from every field name to a sequence of its values, all of the same length.
+
+        Returns:
+            The range of the new slots, in the order of the values.
+        """
+        start = len(self.eta)
+        for name, typecode in FIELDS:
+            getattr(self, name).extend(array(typecode, columns[name]))
+        return range(start, len(self.eta))
+
+    def record(self, slot):
+
+        """
+        Get the fields of a record as a tuple in FIELDS order.
+        """
+        return (self.creation_time[slot], self.order_value[slot], self.delivery_time[slot],
+                self.priority[slot], self.eta[slot], bool(self.out_for_delivery[slot]))
+
+    def copy(self, slot):
+
+        """
+        Copy a record into a new slot, retiring the old one.
+
+        Returns:
+            The new slot.
+        """
+        new_slot = self.allocate(*self.record(slot))
+        self.release(slot)
+        return new_slot
+
+    def release(self, slot):
+
+        """
+        Give up the slot of a removed record.
+        """
+        if self.persistent:
+            self.retired.append((self.epoch, slot))
+        else:
+            self.free.append(slot)
+
+    def clear(self):
+
+        """
+        Release every slot.
+        """
+        if self.persistent:
+            # snapshots may still read any slot, so all of them are retired
+            used = set(self.free)
+            used.update(slot for _, slot in self.retired)
+            self.retired.extend((self.epoch, slot) for slot in range(len(self.eta)) if slot not in used)
+        else:
+            for name, typecode in FIELDS:
+                setattr(self, name, array(typecode))
+            self.free = []
+
+    def pin(self):
+
+        """
+        Protect the slots in use now from being reused.
+
+        Returns:
+            A token; the slots stay protected as long as it is referenced.
+        """
+        with self.lock:
+            self.epoch += 1
+            self.pins[self.epoch] = self.pins.get(self.epoch, 0) + 1
+            token = _Pin()
+            weakref.finalize(token, self._unpin, self.epoch)
+            return token
+
+    def _unpin(self, epoch):
+        with self.lock:
+            self.pins[epoch] -= 1
+            if not self.pins[epoch]:
+                del self.pins[epoch]
+
+    def reclaim(self):
+
+        """
+        Move the retired slots that no live pin can see to the free list.
+        """
+        with self.lock:
+            # a pin sees a slot retired at epoch e if the pin was taken at or before e
+            oldest = min(self.pins, default=self.epoch + 1)
+            while self.retired and self.retired[0][0] < oldest:
+                self.free.append(self.retired.popleft()[1])
@@ -0,0 +1,623 @@
+"""
+Ordered-map backends that Ordersystem can use instead of AVLTree.
+
+Every backend implements the ordered map protocol that Ordersystem relies on:
+
+- get(key), put(key, val), remove(key), len(map), min_item(), clear()
+- iter_items(), iter_reverse(), iter_from(key, reverse=False), range(lo, hi)
+- rank(key) (number of smaller keys) and select(k) (the k-th smallest (key, value) or None)
+- from_sorted(items, metrics=None) and bulk_insert(items) for sorted input
+- split(key) -> (keys < key, keys >= key), leaving the map empty, and join(left, right)
+
+Values are never None. A map must not be modified while it is being iterated over.
+
+Backends:
+- 'avl': AVLTree, one node per key (the default).
+- 'bplus': BPlusTreeMap, sorted leaf arrays under one high-fanout index level.
+- 'skiplist': SkipListMap, an indexable doubly linked skip list.
+- 'bisect': SortedListMap, two parallel sorted lists, for small sizes.
+"""
+import random
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from avl_tree_implementation import AVLTree
+
+
+def _check_sorted(keys):
+
+    """
+    Raise ValueError unless the keys are strictly ascending.
+    """
+    for i in range(1, len(keys)):
+        if not keys[i - 1] < keys[i]:
+            raise ValueError("Keys must be strictly ascending")
+
+
+def _merge_items(existing, batch):
+
+    """
+    Merge two ascending item sequences; for keys in both, the value from batch wins.
+
+    Returns:
+        Two lists (keys, vals).
+    """
+    keys = []
+    vals = []
+    batch = iter(batch)
+    pending = next(batch, None)
+    for key, val in existing:
+        while pending is not None and pending[0] < key:
+            keys.append(pending[0])
+            vals.append(pending[1])
+            pending = next(batch, None)
+        if pending is not None and pending[0] == key:
+            val = pending[1]
+            pending = next(batch, None)
+        keys.append(key)
+        vals.append(val)
+    while pending is not None:
+        keys.append(pending[0])
+        vals.append(pending[1])
+        pending = next(batch, None)
+    return keys, vals
+
+
+class SortedListMap:
+
+    """
+    Ordered map on two parallel sorted lists, searched with bisect.
+
+    Lookups are O(log n) and inserts and deletes are O(n) memory moves, which are fast as long
+    as the map is small.
+    """
+
+    def __init__(self, metrics=None):
+        self.keys = []
+        self.vals = []
+        self.metrics = metrics
+
+    @classmethod
+    def from_sorted(cls, items, metrics=None):
+        items = list(items)
+        keys = [key for key, _ in items]
+        _check_sorted(keys)
+        sorted_map = cls(metrics)
+        sorted_map.keys = keys
+        sorted_map.vals = [val for _, val in items]
+        return sorted_map
+
+    def bulk_insert(self, items):
+        _check_sorted([key for key, _ in items])
+        self.keys, self.vals = _merge_items(zip(self.keys, self.vals), items)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.vals[i]
+        return None
+
+    def put(self, key, val):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.vals[i] = val
+        else:
+            self.keys.insert(i, key)
+            self.vals.insert(i, val)
+
+    def remove(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+            del self.vals[i]
+
+    def min_item(self):
+        if not self.keys:
+            return None
+        return (self.keys[0], self.vals[0])
+
+    def clear(self):
+        self.keys = []
+        self.vals = []
+
+    def iter_items(self):
+        return zip(self.keys, self.vals)
+
+    def iter_reverse(self):
+        return zip(reversed(self.keys), reversed(self.vals))
+
+    def iter_from(self, key, reverse=False):
+        keys, vals = self.keys, self.vals
+        if reverse:
+            for i in range(bisect_right(keys, key) - 1, -1, -1):
+                yield (keys[i], vals[i])
+        else:
+            for i in range(bisect_left(keys, key), len(keys)):
+                yield (keys[i], vals[i])
+
+    def range(self, lo, hi):
+        keys, vals = self.keys, self.vals
+        for i in range(bisect_left(keys, lo), bisect_right(keys, hi)):
+            yield (keys[i], vals[i])
+
+    def rank(self, key):
+        return bisect_left(self.keys, key)
+
+    def select(self, k):
+        if 0 <= k < len(self.keys):
+            return (self.keys[k], self.vals[k])
+        return None
+
+    def split(self, key):
+        i = bisect_left(self.keys, key)
+        left = type(self)(self.metrics)
+        left.keys, left.vals = self.keys[:i], self.vals[:i]
+        right = type(self)(self.metrics)
+        right.keys, right.vals = self.keys[i:], self.vals[i:]
+        self.clear()
+        return left, right
+
+    @classmethod
+    def join(cls, left, right):
+        joined = cls(left.metrics)
+        joined.keys = left.keys + right.keys
+        joined.vals = left.vals + right.vals
+        left.clear()
+        right.clear()
+        return joined
+
+
+class _SkipNode:
+
+    """
+    Skip list node; width[l] is the number of level 0 steps to next[l].
+    """
+    __slots__ = ('key', 'val', 'next', 'width', 'prev')
+
+    def __init__(self, key, val, level):
+        self.key = key
+        self.val = val
+        self.next = [None] * level
+        self.width = [1] * level
+        self.prev = None
+
+
+class SkipListMap:
+
+    """
+    Ordered map on an indexable skip list.
+
+    Every node stores the width of each of its links, so rank and select take O(log n) expected
+    time like search, insert and delete. Searches start at the highest level in use, whose head
+    width is only set once a node reaches it. Level 0 is doubly linked for descending iteration.
+    split and join move the smaller part item by item, in O(min(k, n - k) log n).
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self, metrics=None, seed=0):
+        self.head = _SkipNode(None, None, self.MAX_LEVEL)
+        self.tail = None
+        self.length = 0
+        self.level = 1
+        self.metrics = metrics
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_sorted(cls, items, metrics=None):
+        items = list(items)
+        _check_sorted([key for key, _ in items])
+        skip_list = cls(metrics)
+        for key, val in items:
+            skip_list.put(key, val)
+        return skip_list
+
+    def bulk_insert(self, items):
+        _check_sorted([key for key, _ in items])
+        for key, val in items:
+            self.put(key, val)
+
+    def __len__(self):
+        return self.length
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and self.random.random() < 0.5:
+            level += 1
+        return level
+
+    def _search(self, key):
+
+        """
+        Find the last node before key on every level.
+
+        Returns:
+            A tuple (chain, positions): the nodes and their 0-based positions (the head is -1).
+        """
+        chain = [self.head] * self.MAX_LEVEL
+        positions = [-1] * self.MAX_LEVEL
+        node = self.head
+        position = -1
+        for level in range(self.level - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+
+    def _find(self, key):
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+        node = node.next[0]
+        if node is not None and node.key == key:
+            return node
+        return None
+
+    def get(self, key):
+        node = self._find(key)
+        return None if node is None else node.val
+
+    def put(self, key, val):
+        chain, positions = self._search(key)
+        successor = chain[0].next[0]
+        if successor is not None and successor.key == key:
+            successor.val = val
+            return
+
+        node = _SkipNode(key, val, self._random_level())
+        for level in range(self.level, len(node.next)):
+            self.head.width[level] = self.length + 1
+        self.level = max(self.level, len(node.next))
+        position = positions[0] + 1
+        for level in range(len(node.next)):
+            before = chain[level]
+            steps = position - positions[level]
+            node.next[level] = before.next[level]
+            node.width[level] = before.width[level] - steps + 1
+            before.next[level] = node
+            before.width[level] = steps
+        for level in range(len(node.next), self.level):
+            chain[level].width[level] += 1
+
+        node.prev = chain[0] if chain[0] is not self.head else None
+        if node.next[0] is not None:
+            node.next[0].prev = node
+        else:
+            self.tail = node
+        self.length += 1
+
+    def remove(self, key):
+        chain, _ = self._search(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return
+        for level in range(len(node.next)):
+            chain[level].width[level] += node.width[level] - 1
+            chain[level].next[level] = node.next[level]
+        for level in range(len(node.next), self.level):
+            chain[level].width[level] -= 1
+
+        if node.next[0] is not None:
+            node.next[0].prev = node.prev
+        else:
+            self.tail = node.prev
+        self.length -= 1
+
+    def min_item(self):
+        node = self.head.next[0]
+        return None if node is None else (node.key, node.val)
+
+    def clear(self):
+        self.head = _SkipNode(None, None, self.MAX_LEVEL)
+        self.tail = None
+        self.length = 0
+        self.level = 1
+
+    def _iterate(self, node, reverse):
+        while node is not None:
+            yield (node.key, node.val)
+            node = node.prev if reverse else node.next[0]
+
+    def iter_items(self):
+        return self._iterate(self.head.next[0], False)
+
+    def iter_reverse(self):
+        return self._iterate(self.tail, True)
+
+    def iter_from(self, key, reverse=False):
+        chain, _ = self._search(key)
+        node = chain[0].next[0]
+        if not reverse:
+            return self._iterate(node, False)
+        if node is None or node.key != key:
+            node = chain[0] if chain[0] is not self.head else None
+        return self._iterate(node, True)
+
+    def range(self, lo, hi):
+        for key, val in self.iter_from(lo):
+            if key > hi:
+                return
+            yield (key, val)
+
+    def rank(self, key):
+        _, positions = self._search(key)
+        return positions[0] + 1
+
+    def select(self, k):
+        if not 0 <= k < self.length:
+            return None
+        node = self.head
+        remaining = k + 1
+        for level in range(self.level - 1, -1, -1):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return (node.key, node.val)
+
+    def split(self, key):
+        cut = self.rank(key)
+        move_left = cut <= self.length - cut
+        if move_left:
+            items = list(islice(self.iter_items(), cut))
+        else:
+            items = list(islice(self.iter_reverse(), self.length - cut))[::-1]
+        for item_key, _ in items:
+            self.remove(item_key)
+
+        moved = type(self)(self.metrics)
+        moved.bulk_insert(items)
+        # the remaining nodes are handed over to a new map, so this one is left empty
+        kept = type(self)(self.metrics)
+        kept.head, kept.tail, kept.length, kept.level = self.head, self.tail, self.length, self.level
+        self.clear()
+        return (moved, kept) if move_left else (kept, moved)
+
+    @classmethod
+    def join(cls, left, right):
+        larger, smaller = (left, right) if len(left) >= len(right) else (right, left)
+        joined = cls(left.metrics)
+        joined.head, joined.tail, joined.length, joined.level = larger.head, larger.tail, larger.length, larger.level
+        joined.bulk_insert(list(smaller.iter_items()))
+        left.clear()
+        right.clear()
+        return joined
+
+
+class BPlusTreeMap:
+
+    """
+    Ordered map on sorted leaf arrays under a single high-fanout index level.
+
+    The leaves are Python lists of up to 2 * LEAF_SIZE keys (with parallel value lists) and the
+    index holds the largest key of every leaf, so a lookup is one bisect over the index and one
+    within a leaf. This is a B+-tree of height two; with LEAF_SIZE keys per leaf a million keys
+    need a few thousand leaves, and the index stays a flat list. Positions of the leaves for
+    rank and select are recomputed lazily after a change.
+    """
+
+    LEAF_SIZE = 256
+
+    def __init__(self, metrics=None):
+        self.leaf_keys = []
+        self.leaf_vals = []
+        self.maxes = []
+        self.length = 0
+        self.offsets = None
+        self.metrics = metrics
+
+    @classmethod
+    def from_sorted(cls, items, metrics=None):
+        items = list(items)
+        keys = [key for key, _ in items]
+        _check_sorted(keys)
+        tree = cls(metrics)
+        tree._load(keys, [val for _, val in items])
+        return tree
+
+    def _load(self, keys, vals):
+        size = self.LEAF_SIZE
+        self.leaf_keys = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self.leaf_vals = [vals[i:i + size] for i in range(0, len(vals), size)]
+        self.maxes = [leaf[-1] for leaf in self.leaf_keys]
+        self.length = len(keys)
+        self.offsets = None
+
+    def bulk_insert(self, items):
+        _check_sorted([key for key, _ in items])
+        self._load(*_merge_items(self.iter_items(), items))
+
+    def __len__(self):
+        return self.length
+
+    def _leaf(self, key):
+
+        """
+        Index of the leaf that holds key, or would hold it if inserted.
+        """
+        i = bisect_left(self.maxes, key)
+        return i if i < len(self.maxes) else len(self.maxes) - 1
+
+    def get(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return None
+        keys = self.leaf_keys[i]
+        j = bisect_left(keys, key)
+        if keys[j] == key:
+            return self.leaf_vals[i][j]
+        return None
+
+    def put(self, key, val):
+        if not self.maxes:
+            self.leaf_keys.append([key])
+            self.leaf_vals.append([val])
+            self.maxes.append(key)
+            self.length = 1
+            self.offsets = None
+            return
+
+        i = self._leaf(key)
+        keys, vals = self.leaf_keys[i], self.leaf_vals[i]
+        j = bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            vals[j] = val
+            return
+        keys.insert(j, key)
+        vals.insert(j, val)
+        self.maxes[i] = keys[-1]
+        self.length += 1
+        self.offsets = None
+
+        if len(keys) > 2 * self.LEAF_SIZE:
+            half = len(keys) // 2
+            self.leaf_keys.insert(i + 1, keys[half:])
+            self.leaf_vals.insert(i + 1, vals[half:])
+            del keys[half:]
+            del vals[half:]
+            self.maxes.insert(i, keys[-1])
+
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return
+        keys, vals = self.leaf_keys[i], self.leaf_vals[i]
+        j = bisect_left(keys, key)
+        if keys[j] != key:
+            return
+        del keys[j]
+        del vals[j]
+        self.length -= 1
+        self.offsets = None
+
+        if not keys:
+            del self.leaf_keys[i]
+            del self.leaf_vals[i]
+            del self.maxes[i]
+            return
+        self.maxes[i] = keys[-1]
+        # merge a leaf that fell under half the leaf size into its right neighbour if both fit
+        if len(keys) < self.LEAF_SIZE // 2 and i + 1 < len(self.maxes) \
+                and len(keys) + len(self.leaf_keys[i + 1]) <= self.LEAF_SIZE:
+            self.leaf_keys[i + 1][:0] = keys
+            self.leaf_vals[i + 1][:0] = vals
+            del self.leaf_keys[i]
+            del self.leaf_vals[i]
+            del self.maxes[i]
+
+    def min_item(self):
+        if not self.maxes:
+            return None
+        return (self.leaf_keys[0][0], self.leaf_vals[0][0])
+
+    def clear(self):
+        self.leaf_keys = []
+        self.leaf_vals = []
+        self.maxes = []
+        self.length = 0
+        self.offsets = None
+
+    def iter_items(self):
+        for keys, vals in zip(self.leaf_keys, self.leaf_vals):
+            yield from zip(keys, vals)
+
+    def iter_reverse(self):
+        for i in range(len(self.maxes) - 1, -1, -1):
+            yield from zip(reversed(self.leaf_keys[i]), reversed(self.leaf_vals[i]))
+
+    def iter_from(self, key, reverse=False):
+        if not self.maxes:
+            return
+        if reverse:
+            i = bisect_left(self.maxes, key)
+            if i == len(self.maxes):
+                i -= 1
+            keys, vals = self.leaf_keys[i], self.leaf_vals[i]
+            for j in range(bisect_right(keys, key) - 1, -1, -1):
+                yield (keys[j], vals[j])
+            for i in range(i - 1, -1, -1):
+                yield from zip(reversed(self.leaf_keys[i]), reversed(self.leaf_vals[i]))
+        else:
+            i = bisect_left(self.maxes, key)
+            if i == len(self.maxes):
+                return
+            keys, vals = self.leaf_keys[i], self.leaf_vals[i]
+            for j in range(bisect_left(keys, key), len(keys)):
+                yield (keys[j], vals[j])
+            for i in range(i + 1, len(self.maxes)):
+                yield from zip(self.leaf_keys[i], self.leaf_vals[i])
+
+    def range(self, lo, hi):
+        for key, val in self.iter_from(lo):
+            if key > hi:
+                return
+            yield (key, val)
+
+    def _offsets(self):
+        if self.offsets is None:
+            offsets = []
+            total = 0
+            for keys in self.leaf_keys:
+                offsets.append(total)
+                total += len(keys)
+            self.offsets = offsets
+        return self.offsets
+
+    def rank(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return self.length
+        return self._offsets()[i] + bisect_left(self.leaf_keys[i], key)
+
+    def select(self, k):
+        if not 0 <= k < self.length:
+            return None
+        i = bisect_right(self._offsets(), k) - 1
+        j = k - self.offsets[i]
+        return (self.leaf_keys[i][j], self.leaf_vals[i][j])
+
+    def split(self, key):
+        left = type(self)(self.metrics)
+        right = type(self)(self.metrics)
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            left.leaf_keys, left.leaf_vals, left.maxes = self.leaf_keys, self.leaf_vals, self.maxes
+        else:
+            # only the leaf holding the split key is cut; the others are moved by reference
+            keys, vals = self.leaf_keys[i], self.leaf_vals[i]
+            j = bisect_left(keys, key)
+            left.leaf_keys = self.leaf_keys[:i] + ([keys[:j]] if j else [])
+            left.leaf_vals = self.leaf_vals[:i] + ([vals[:j]] if j else [])
+            right.leaf_keys = [keys[j:]] + self.leaf_keys[i + 1:]
+            right.leaf_vals = [vals[j:]] + self.leaf_vals[i + 1:]
+            left.maxes = self.maxes[:i] + ([keys[j - 1]] if j else [])
+            right.maxes = self.maxes[i:]
+        left.length = sum(map(len, left.leaf_keys))
+        right.length = self.length - left.length
+        self.clear()
+        return left, right
+
+    @classmethod
+    def join(cls, left, right):
+        joined = cls(left.metrics)
+        joined.leaf_keys = left.leaf_keys + right.leaf_keys
+        joined.leaf_vals = left.leaf_vals + right.leaf_vals
+        joined.maxes = left.maxes + right.maxes
+        joined.length = left.length + right.length
+        left.clear()
+        right.clear()
+        return joined
+
+
+# the backends selectable with Ordersystem(backend=...)
+BACKENDS = {
+    'avl': AVLTree,
+    'bplus': BPlusTreeMap,
+    'skiplist': SkipListMap,
+    'bisect': SortedListMap,
+}
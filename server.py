@@ -0,0 +1,105 @@
+"""
+Asyncio socket front-end: a long-running Ordersystem that accepts commands from many clients.
+
+Clients send the command syntax of the input files, one command per line, and may pipeline any
+number of commands without waiting. The server answers every command with its output lines
+followed by an empty line, in the order the commands were sent. Invalid commands, including
+commands with the wrong number of arguments, are answered with "Invalid command" and not
+applied. All commands of all clients are applied to one Ordersystem from the event loop thread,
+one command at a time, so the semantics are those of the file mode.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 7878] [--unix PATH]
+"""
+import argparse
+import asyncio
+import io
+
+from gatorDelivery import Ordersystem, get_handler, parse_command
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7878
+
+# bytes read from a client at a time; every command received in one read is answered with one write
+READ_SIZE = 1 << 16
+
+
+class OrderServer:
+
+    """
+    Serves one Ordersystem to many socket clients.
+    """
+
+    def __init__(self, metrics=None):
+        self.oms = Ordersystem(None, metrics=metrics)
+
+    def execute(self, lines):
+
+        """
+        Apply a run of command lines and return the framed responses as one string.
+        """
+        output = io.StringIO()
+        self.oms.f = output
+        for line in lines:
+            if len(line.strip()) == 0:
+                continue
+            try:
+                command, args = parse_command(line)
+                handler = get_handler(command, args)
+            except ValueError as error:
+                output.write(f"{error}\n")
+            else:
+                handler(self.oms, args)
+            output.write("\n")
+        return output.getvalue()
+
+    async def handle_client(self, reader, writer):
+
+        """
+        Answer the commands of one connection until the client closes it.
+        """
+        pending = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                pending += data
+                complete, newline, pending = pending.rpartition(b"\n")
+                if not newline:
+                    continue
+                # apply every complete command received so far and answer them with a single write
+                writer.write(self.execute(complete.decode().split("\n")).encode())
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+
+        """
+        Listen on a local TCP port, or on a Unix socket if path is given, until cancelled.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host=host, port=port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help='listen on this Unix socket instead of TCP')
+    args = parser.parse_args()
+    try:
+        asyncio.run(OrderServer().serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
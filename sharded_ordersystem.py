@@ -0,0 +1,261 @@
+"""
+Sharded Ordersystem: orders are partitioned across independent driver/region instances.
+
+Every shard is a complete Ordersystem with its own driver and trees, running in its own worker
+process. Commands about one order are routed to a single shard by a routing function on the
+order ID; print(t1, t2) and Quit() are sent to every shard. The output of the shards is merged
+back in command order:
+
+- a routed command writes the output of its shard;
+- print(t1, t2) writes one list holding the orders of every shard, shard by shard, or
+  "There are no orders in that time period" if no shard has any;
+- Quit() writes the remaining deliveries of every shard, shard by shard.
+
+Because each shard has its own driver and only sees the times of its own commands, the
+output differs from a single Ordersystem for any number of shards above one.
+"""
+import heapq
+import io
+import multiprocessing
+import queue
+
+from gatorDelivery import COMMANDS, DEFAULT_FLUSH_SIZE, Ordersystem, get_handler, parse_command
+
+# number of commands sent to a shard at a time
+DEFAULT_BATCH_SIZE = 1024
+
+NO_ORDERS = "There are no orders in that time period\n"
+
+# seconds to wait for shard results before checking that the workers are still alive
+POLL_INTERVAL = 0.1
+
+
+def route_by_order_id(order_id, shards):
+
+    """
+    Default routing function: spread the orders evenly by ID.
+    """
+    return order_id % shards
+
+
+def is_broadcast(command, args):
+
+    """
+    Whether a command goes to every shard instead of the shard of one order.
+    """
+    return command == 'Quit' or (command == 'print' and len(args) == 2)
+
+
+def _run_batch(oms, batch):
+
+    """
+    Apply a batch of (seq, command, args) on a shard and return the (seq, output) pairs.
+    """
+    output = io.StringIO()
+    oms.f = output
+    ends = []
+    for seq, command, args in batch:
+        COMMANDS[command](oms, args)
+        ends.append((seq, output.tell()))
+    text = output.getvalue()
+    results = []
+    start = 0
+    for seq, end in ends:
+        results.append((seq, text[start:end]))
+        start = end
+    return results
+
+
+def _shard_worker(shard, inbox, outbox):
+
+    """
+    Worker process of one shard: apply command batches until None is received.
+
+    The outbox receives (shard, results, None) per batch, or (shard, None, error) if a command
+    raised, after which the worker stops.
+    """
+    oms = Ordersystem(None)
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            return
+        try:
+            results = _run_batch(oms, batch)
+        except Exception as error:
+            outbox.put((shard, None, error))
+            return
+        outbox.put((shard, results, None))
+
+
+def merge_range_outputs(parts):
+
+    """
+    Merge the print(t1, t2) outputs of the shards into one line.
+    """
+    items = [part[1:-2] for part in parts if part != NO_ORDERS]
+    if not items:
+        return NO_ORDERS
+    return "[" + ",".join(items) + "]\n"
+
+
+class ShardedOrdersystem:
+
+    """
+    N independent Ordersystem shards in worker processes, fed through queues.
+    """
+
+    def __init__(self, shards, route=route_by_order_id, batch_size=DEFAULT_BATCH_SIZE):
+
+        """
+        Start the shard processes.
+
+        Args:
+            shards: The number of shards.
+            route: Function (order_id, shards) -> shard index.
+            batch_size: The number of commands sent to a shard at a time.
+        """
+        self.shards = shards
+        self.route = route
+        self.batch_size = batch_size
+        self.outbox = multiprocessing.Queue()
+        self.inboxes = [multiprocessing.Queue() for _ in range(shards)]
+        self.workers = [multiprocessing.Process(target=_shard_worker, args=(shard, inbox, self.outbox), daemon=True)
+                        for shard, inbox in enumerate(self.inboxes)]
+        for worker in self.workers:
+            worker.start()
+
+        self.batches = [[] for _ in range(shards)]
+        self.next_seq = 0
+        # per command: the command name and the outputs received so far, by shard
+        self.pending = {}
+        self.ready = []
+        self.written = 0
+
+    def submit(self, command, args):
+
+        """
+        Route a command to its shard (or to every shard) without waiting for its output.
+        """
+        get_handler(command, args)
+        seq = self.next_seq
+        self.next_seq += 1
+        if is_broadcast(command, args):
+            targets = range(self.shards)
+        else:
+            targets = (self.route(args[0], self.shards),)
+        self.pending[seq] = (command, len(targets), {})
+        for shard in targets:
+            batch = self.batches[shard]
+            batch.append((seq, command, args))
+            if len(batch) >= self.batch_size:
+                self._send(shard)
+
+    def _send(self, shard):
+        if self.batches[shard]:
+            self.inboxes[shard].put(self.batches[shard])
+            self.batches[shard] = []
+
+    def _receive(self, block):
+
+        """
+        Collect one batch of shard results; returns False if none was available.
+
+        Raises:
+            The exception of a command that failed in a shard, or RuntimeError if a shard process
+            exited while results are being waited for.
+        """
+        while True:
+            try:
+                shard, results, error = self.outbox.get(block, POLL_INTERVAL)
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                for index, worker in enumerate(self.workers):
+                    if not worker.is_alive():
+                        raise RuntimeError(f"Shard {index} exited with code {worker.exitcode}")
+        if error is not None:
+            raise error
+        for seq, output in results:
+            command, expected, parts = self.pending[seq]
+            parts[shard] = output
+            if len(parts) == expected:
+                heapq.heappush(self.ready, seq)
+        return True
+
+    def write_ready(self, file, wait=False):
+
+        """
+        Write the merged output of every command whose output is complete, in command order.
+
+        Args:
+            file: The file object to write to.
+            wait: Whether to send the partial batches and wait until every submitted command is written.
+        """
+        if wait:
+            for shard in range(self.shards):
+                self._send(shard)
+        while True:
+            while self._receive(False):
+                pass
+            while self.ready and self.ready[0] == self.written:
+                seq = heapq.heappop(self.ready)
+                command, expected, parts = self.pending.pop(seq)
+                outputs = [parts[shard] for shard in sorted(parts)]
+                if command == 'print' and expected > 1:
+                    file.write(merge_range_outputs(outputs))
+                else:
+                    file.write("".join(outputs))
+                self.written += 1
+            if not wait or self.written == self.next_seq:
+                return
+            self._receive(True)
+
+    def close(self):
+
+        """
+        Stop the shard processes.
+        """
+        for shard, inbox in enumerate(self.inboxes):
+            self._send(shard)
+            inbox.put(None)
+        for worker in self.workers:
+            # a worker cannot exit before its results are read, so results nobody waits for
+            # (e.g. after a failed command) are discarded
+            while worker.is_alive():
+                try:
+                    self.outbox.get(True, POLL_INTERVAL)
+                except queue.Empty:
+                    pass
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_sharded(soms, lines, file):
+
+    """
+    Execute command lines on a ShardedOrdersystem, writing the merged output in command order.
+    """
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+        command, args = parse_command(line)
+        soms.submit(command, args)
+        if soms.next_seq % soms.batch_size == 0:
+            soms.write_ready(file)
+    soms.write_ready(file, wait=True)
+
+
+def main(input_filename, output_filename, shards, flush_size=DEFAULT_FLUSH_SIZE):
+
+    """
+    Like gatorDelivery.main, but with the orders partitioned across shards.
+    """
+    with open(output_filename, 'w', buffering=flush_size) as file, open(input_filename, 'r') as f, \
+            ShardedOrdersystem(shards) as soms:
+        run_sharded(soms, f, file)